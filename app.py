@@ -1,7 +1,13 @@
 from enum import Enum, unique
 
 import pygame
-from components.grid import Grid, GridState, load_grid_from_txt, save_grid_as_txt
+from components.grid import (
+    ArrayGrid,
+    Grid,
+    GridState,
+    load_grid_from_file,
+    save_grid_as_txt,
+)
 from components.simulation import Simulation
 from const import BOTTOM_UI_HEIGHT, BUTTON_WIDTH, WIDTH, HEIGHT, BLOCK_SIZE, ZOOM_SCALE
 
@@ -42,9 +48,9 @@ class App:
     button_surface = pygame.Surface((BUTTON_PANEL_WIDTH, HEIGHT))
 
     # Pass the surface to the grid class
-    _grid = load_grid_from_txt(map_surface, BLOCK_SIZE)
+    _grid = load_grid_from_file(map_surface, BLOCK_SIZE, grid_cls=ArrayGrid)
     if _grid is None:
-        _grid = Grid(cols, rows, BLOCK_SIZE, map_surface)
+        _grid = ArrayGrid(cols, rows, BLOCK_SIZE, map_surface)
     grid: Grid = _grid
 
     # load the simulation 
@@ -61,6 +67,17 @@ class App:
     is_placing_first_coords = None
     is_placing_last_coords = None
 
+    # scaled copy of the visible part of the map and the (zoom, area) it shows
+    zoom_cache: pygame.Surface | None = None
+    zoom_cache_key: tuple[float, tuple[int, int, int, int]] | None = None
+
+    def __init__(self):
+        # any edit of the map makes the scaled copy stale
+        self.grid.add_listener(self.on_map_change)
+
+    def on_map_change(self, x1: int, y1: int, x2: int, y2: int):
+        self.zoom_cache_key = None
+
     def handle_key_click(self, event: pygame.event.Event):
         grid = self.grid
         # check for num keys and handle trigger the keypress from buttons
@@ -145,30 +162,49 @@ class App:
             grid.current_block,
         )
 
+    def get_visible_area(self) -> pygame.Rect:
+        # pixel rect of the unzoomed map under the viewport, snapped to whole cells
+        cell = BLOCK_SIZE * self.zoom_level
+        c0 = max(int(-self.offset_x // cell), 0)
+        r0 = max(int(-self.offset_y // cell), 0)
+        c1 = min(int((self.MAP_WIDTH - self.offset_x) // cell) + 1, self.grid.cols)
+        r1 = min(int((self.MAP_HEIGHT - self.offset_y) // cell) + 1, self.grid.rows)
+        area = pygame.Rect(
+            c0 * BLOCK_SIZE,
+            r0 * BLOCK_SIZE,
+            max(c1 - c0, 0) * BLOCK_SIZE,
+            max(r1 - r0, 0) * BLOCK_SIZE,
+        )
+        return area.clip(self.map_surface.get_rect())
+
     def draw(self):
         zoom_level = self.zoom_level
         offset_x, offset_y = self.offset_x, self.offset_y
-
-        # Draw the grid
-        self.grid.draw_grid()
-
-        # draw the people and simulation 
-        self.simulation.draw()
-
-        # Create a scaled version of the grid surface for zooming
-        zoomed_surface = pygame.transform.scale(
-            self.map_surface,
-            (
-                int(self.map_surface.get_width() * zoom_level),
-                int(self.map_surface.get_height() * zoom_level),
-            ),
-        )
-
-        # Define the portion of the zoomed surface (map) to display on the screen (viewport)
-        viewport = pygame.Rect(-offset_x, -offset_y, self.MAP_WIDTH, self.MAP_HEIGHT)
-
-        # Blit the zoomed map surface onto the root surface
-        self.root_surface.blit(zoomed_surface, (0, 0), viewport)
+        map_rect = pygame.Rect(0, 0, self.MAP_WIDTH, self.MAP_HEIGHT)
+
+        # only the cells under the viewport are drawn and scaled, the scaled
+        # copy is reused until the zoom, the visible cells or the map change
+        area = self.get_visible_area()
+        key = (zoom_level, tuple(area))
+        if self.zoom_cache_key != key and area.width and area.height:
+            self.grid.draw_grid(area)
+            self.zoom_cache = pygame.transform.scale(
+                self.map_surface.subsurface(area),
+                (round(area.width * zoom_level), round(area.height * zoom_level)),
+            )
+            self.zoom_cache_key = key
+
+        # Blit the zoomed map onto the root surface (viewport)
+        self.root_surface.set_clip(map_rect)
+        if self.zoom_cache_key == key and self.zoom_cache is not None:
+            self.root_surface.blit(
+                self.zoom_cache,
+                (round(area.x * zoom_level) + offset_x, round(area.y * zoom_level) + offset_y),
+            )
+
+        # draw the people and simulation straight in screen space
+        self.simulation.draw(self.root_surface, zoom_level, (offset_x, offset_y))
+        self.root_surface.set_clip(None)
 
         # Blit the hud surface onto the root surface (at the bottom) 
         self.root_surface.blit(self.hud_surface, self.hud_surface_rect.topleft)
@@ -0,0 +1 @@
+from .city import generate_city, make_city
@@ -0,0 +1,75 @@
+"""
+    Times drawing the people of a simulation, one pygame.draw.circle per
+    person as before against the batched AgentRenderer, for an 800x600
+    window over a 200x200 map
+
+    Usage: python -m benchmarks.bench_agents [counts...]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import numpy as np
+import pygame
+
+from benchmarks.city import make_city
+from components.population import NUM_DAYS, PopulationArrays
+from components.renderer import AgentRenderer
+from components.simulation import Simulation
+from const import BLOCK_SIZE, HEIGHT, WIDTH
+
+SIZE = 200
+
+
+def legacy_draw(simulation: Simulation, surface: pygame.Surface, zoom: float, offset):
+    for person in simulation.people:
+        r, c = person.loc
+        rect = pygame.Rect(c * BLOCK_SIZE, r * BLOCK_SIZE, BLOCK_SIZE, BLOCK_SIZE)
+        center = (rect.centerx * zoom + offset[0], rect.centery * zoom + offset[1])
+        pygame.draw.circle(surface, (255, 0, 0), center, 10 * zoom)
+
+
+def make_simulation(count: int, seed: int = 0) -> Simulation:
+    grid = make_city(SIZE)
+    grid.grid_size = BLOCK_SIZE
+    simulation = Simulation(grid)
+    rng = np.random.default_rng(seed)
+    people = PopulationArrays(
+        np.zeros(count * NUM_DAYS + 1),
+        [],
+        [],
+        [],
+        rng.integers(0, SIZE, count),
+        rng.integers(0, SIZE, count),
+    )
+    people.state[:] = rng.integers(0, 2, count)
+    simulation.people = people
+    return simulation
+
+
+def frame_ms(draw, frames: int, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(frames):
+        draw(*args)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main(counts: list[int], frames: int = 5):
+    screen = pygame.Surface((WIDTH, HEIGHT))
+    print(f"{'agents':>8} {'zoom':>5} {'legacy ms':>10} {'batched ms':>11} {'mode':>8}")
+    for count in counts:
+        simulation = make_simulation(count)
+        renderer = AgentRenderer(simulation)
+        for zoom in (1.0, 0.5):
+            offset = (-SIZE * BLOCK_SIZE * zoom // 3, -SIZE * BLOCK_SIZE * zoom // 3)
+            legacy = frame_ms(legacy_draw, frames, simulation, screen, zoom, offset)
+            batched = frame_ms(renderer.draw, frames, screen, zoom, offset)
+            # people are spread evenly, so the density is the same in every view
+            mode = "heatmap" if count / SIZE**2 > renderer.density_threshold else "sprites"
+            print(f"{count:>8} {zoom:>5} {legacy:>10.2f} {batched:>11.2f} {mode:>8}")
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [1_000, 10_000, 100_000])
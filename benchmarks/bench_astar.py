@@ -0,0 +1,117 @@
+"""
+    Compares the heap based A* in components.pathfinding against the original
+    list based search on lattice cities of growing size
+
+    Usage: python -m benchmarks.bench_astar [sizes...]
+"""
+import random
+import sys
+import time
+
+from benchmarks.city import make_city
+from components.grid import GridState
+from components.simulation import Simulation
+
+
+def legacy_a_star(sim: Simulation, src, dest):
+    # the list based search that used to live in Simulation.get_a_star_path
+    r, c = dest
+    dest_type = sim.grid[r, c]
+
+    def match(p1, p2):
+        return sim.block_ids[p1[0]][p1[1]] == sim.block_ids[p2[0]][p2[1]]
+
+    def is_dest(loc):
+        return any(match(n, dest) for n in get_neighbours(loc))
+
+    def h(loc1, loc2):
+        return abs(loc1[0] - loc2[0]) + abs(loc1[1] - loc2[1])
+
+    def get_neighbours(loc):
+        r, c = loc
+        neighbours = []
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            if sim.check_in_bounds(c + dx, r + dy) and sim.grid[
+                r + dy, c + dx
+            ] in [GridState.ROAD, dest_type]:
+                neighbours.append((r + dy, c + dx))
+        return neighbours
+
+    open_list = [src]
+    visited_set = set()
+    g = {src: 0}
+    f = {src: h(src, dest)}
+    came_from = dict()
+    while open_list:
+        current = min(open_list, key=lambda x: f[x])
+        if is_dest(current):
+            path = [dest]
+            while current != src:
+                path.append(current)
+                current = came_from[current]
+            path.append(src)
+            return path[::-1]
+        open_list.remove(current)
+        visited_set.add(current)
+        for neighbour in get_neighbours(current):
+            if neighbour in visited_set:
+                continue
+            if neighbour not in open_list:
+                open_list.append(neighbour)
+            tentative_g = g[current] + 1
+            if tentative_g >= g.get(neighbour, float("inf")):
+                continue
+            came_from[neighbour] = current
+            g[neighbour] = tentative_g
+            f[neighbour] = g[neighbour] + h(neighbour, dest)
+    return []
+
+
+def make_queries(sim: Simulation, n: int, seed: int = 0):
+    rng = random.Random(seed)
+    roads = [
+        (r, c)
+        for r in range(sim.rows)
+        for c in range(sim.cols)
+        if sim.grid[r, c] == GridState.ROAD
+    ]
+    places = [
+        (r, c)
+        for r in range(sim.rows)
+        for c in range(sim.cols)
+        if sim.block_ids[r][c] != -1 and sim.grid[r, c] != GridState.HOUSE
+    ]
+    return [(rng.choice(roads), rng.choice(places)) for _ in range(n)]
+
+
+def bench(fn, queries) -> tuple[float, list]:
+    start = time.perf_counter()
+    paths = [fn(src, dest) for src, dest in queries]
+    return time.perf_counter() - start, paths
+
+
+def main(sizes: list[int], n_queries: int = 20, legacy_limit: int = 400):
+    print(f"{'size':>6} {'legacy ms':>12} {'heap ms':>10} {'speed-up':>9}")
+    for size in sizes:
+        sim = Simulation(make_city(size))
+        sim.label_blocks()
+        queries = make_queries(sim, n_queries)
+
+        heap_time, heap_paths = bench(sim.get_a_star_path, queries)
+        heap_ms = heap_time * 1000 / n_queries
+        if size > legacy_limit:
+            print(f"{size:>6} {'-':>12} {heap_ms:>10.2f} {'-':>9}")
+            continue
+
+        legacy_time, legacy_paths = bench(
+            lambda src, dest: legacy_a_star(sim, src, dest), queries
+        )
+        assert heap_paths == legacy_paths, "paths differ from the legacy search"
+        legacy_ms = legacy_time * 1000 / n_queries
+        print(
+            f"{size:>6} {legacy_ms:>12.2f} {heap_ms:>10.2f} {legacy_ms / heap_ms:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [50, 100, 200, 400])
@@ -0,0 +1,80 @@
+"""
+    Frame time of App.draw against the compositor it replaced, which drew
+    and scaled the whole map surface every frame
+
+    Usage: python -m benchmarks.bench_compose [sizes...]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from app import App
+from benchmarks.city import make_city
+from colors import WHITE
+from components.grid import GridState
+from components.simulation import Simulation
+from const import BLOCK_SIZE
+
+
+def legacy_draw(app: App):
+    # the whole map drawn with the people, scaled, then cropped to the viewport
+    app.map_surface.fill(WHITE)
+    app.grid.draw_grid()
+    app.simulation.draw()
+    zoomed_surface = pygame.transform.scale(
+        app.map_surface,
+        (
+            int(app.map_surface.get_width() * app.zoom_level),
+            int(app.map_surface.get_height() * app.zoom_level),
+        ),
+    )
+    viewport = pygame.Rect(-app.offset_x, -app.offset_y, app.MAP_WIDTH, app.MAP_HEIGHT)
+    app.root_surface.blit(zoomed_surface, (0, 0), viewport)
+    app.root_surface.blit(app.hud_surface, app.hud_surface_rect.topleft)
+    app.root_surface.blit(app.button_surface, app.button_surface_rect.topleft)
+
+
+def make_app(size: int, population: int) -> App:
+    app = App()
+    app.grid = make_city(size)
+    app.grid.grid_size = BLOCK_SIZE
+    app.map_surface = pygame.Surface((size * BLOCK_SIZE + 10, size * BLOCK_SIZE + 10))
+    app.grid.surface = app.map_surface
+    app.grid.add_listener(app.on_map_change)
+    app.simulation = Simulation(app.grid, seed=0)
+    app.simulation.generate_population(population)
+    return app
+
+
+def frame_ms(draw, app: App, frames: int, scenario: str) -> float:
+    start = time.perf_counter()
+    for i in range(frames):
+        if scenario == "pan":
+            app.offset_x -= 3
+        elif scenario == "edit":
+            app.grid.place_block(i % app.grid.cols, 1, GridState.PARK if i % 2 else GridState.ROAD)
+        app.root_surface.fill(WHITE)
+        draw(app)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main(sizes: list[int], frames: int = 20, population: int = 500):
+    print(f"{'size':>6} {'zoom':>5} {'frame':>6} {'legacy ms':>10} {'culled ms':>10}")
+    for size in sizes:
+        app = make_app(size, population)
+        for zoom in (1.0, 2.0):
+            for scenario in ("idle", "pan", "edit"):
+                app.zoom_level = zoom
+                app.offset_x, app.offset_y = -size * BLOCK_SIZE // 4, -size * BLOCK_SIZE // 4
+                legacy = frame_ms(legacy_draw, app, frames, scenario)
+                app.offset_x, app.offset_y = -size * BLOCK_SIZE // 4, -size * BLOCK_SIZE // 4
+                culled = frame_ms(App.draw, app, frames, scenario)
+                print(f"{size:>6} {zoom:>5} {scenario:>6} {legacy:>10.2f} {culled:>10.2f}")
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [100, 200])
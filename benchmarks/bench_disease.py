@@ -0,0 +1,49 @@
+"""
+    Times one simulated hour of the SEIR layer (Disease.step_hour) for large
+    populations spread over a generated city
+
+    Usage: python -m benchmarks.bench_disease [sizes...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.city import generate_city
+from components.disease import DiseaseParams, HealthState
+from components.population import NUM_DAYS, PopulationArrays
+from components.simulation import Simulation
+
+HOURS = 24
+
+
+def make_simulation(size: int, city: int = 1000, seed: int = 0) -> Simulation:
+    # people placed on random building cells, schedules are not needed here
+    simulation = Simulation(generate_city(city, seed=seed), seed)
+    simulation.label_blocks()
+    rng = np.random.default_rng(seed)
+    cells = np.flatnonzero(simulation.block_labels.labels.ravel() >= 0)
+    rows, cols = np.divmod(rng.choice(cells, size), city)
+    simulation.people = PopulationArrays(np.zeros(size * NUM_DAYS + 1), [], [], [], rows, cols)
+    simulation.rebuild_spatial_index()
+    return simulation
+
+
+def main(sizes: list[int]):
+    print(f"{'people':>10} {'ms per hour':>12} {'infected after a day':>21}")
+    for size in sizes:
+        simulation = make_simulation(size)
+        simulation.use_disease(params=DiseaseParams(beta=0.5, initial_infected=size // 100), seed=1)
+        disease = simulation.disease
+        assert disease is not None
+
+        start = time.perf_counter()
+        for _ in range(HOURS):
+            disease.step_hour()
+        elapsed = (time.perf_counter() - start) / HOURS
+        infected = size - disease.counts()[HealthState.Susceptible]
+        print(f"{size:>10} {elapsed * 1000:>12.2f} {infected:>21}")
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
@@ -0,0 +1,72 @@
+"""
+    Times Grid.draw_grid offscreen against the immediate mode loop it
+    replaced, for an idle map and for a map with one edit per frame
+
+    Usage: python -m benchmarks.bench_draw [sizes...]
+"""
+import os
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from benchmarks.city import make_city
+from colors import GREY, WHITE
+from components.grid import Grid, GridState
+
+BLOCK_SIZE = 20
+
+
+def legacy_draw_grid(grid: Grid):
+    # two draw calls per cell every frame
+    for y in range(grid.rows):
+        for x in range(grid.cols):
+            rect = pygame.Rect(
+                x * grid.grid_size, y * grid.grid_size, grid.grid_size, grid.grid_size
+            )
+            pygame.draw.rect(grid.surface, GREY, rect, 1)
+            block = grid[y, x]
+            if block != GridState.EMPTY:
+                pygame.draw.rect(grid.surface, block.value, rect)
+
+
+def frame_ms(draw, grid: Grid, frames: int, edit: bool) -> float:
+    start = time.perf_counter()
+    for i in range(frames):
+        if edit:
+            x, y = i % grid.cols, (i * 7) % grid.rows
+            grid.place_block(x, y, GridState.PARK if grid[y, x] != GridState.PARK else GridState.ROAD)
+        grid.surface.fill(WHITE)
+        draw(grid)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main(sizes: list[int], frames: int = 20):
+    print(f"{'size':>6} {'frame':>6} {'legacy ms':>10} {'cached ms':>10} {'first draw ms':>14}")
+    for size in sizes:
+        grid = make_city(size)
+        grid.grid_size = BLOCK_SIZE
+        grid.surface = pygame.Surface((size * BLOCK_SIZE, size * BLOCK_SIZE))
+
+        start = time.perf_counter()
+        grid.draw_grid()
+        first = (time.perf_counter() - start) * 1000
+
+        # same pixels as the legacy loop
+        cached = grid.surface.copy()
+        grid.surface.fill(WHITE)
+        legacy_draw_grid(grid)
+        assert pygame.image.tobytes(cached, "RGB") == pygame.image.tobytes(grid.surface, "RGB")
+
+        for edit in (False, True):
+            legacy = frame_ms(legacy_draw_grid, grid, frames, edit)
+            new = frame_ms(Grid.draw_grid, grid, frames, edit)
+            print(
+                f"{size:>6} {'edit' if edit else 'idle':>6} {legacy:>10.2f} {new:>10.2f} {first:>14.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [50, 100, 200])
@@ -0,0 +1,59 @@
+"""
+    Times saving and loading a map in the text format and the binary format,
+    plain (memory-mapped on load) and zlib compressed, and reports file sizes
+
+    Usage: python -m benchmarks.bench_grid_io [sizes...]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.city import make_city
+from components.grid import (
+    load_grid_from_bin,
+    load_grid_from_txt,
+    save_grid_as_bin,
+    save_grid_as_txt,
+)
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def main(sizes: list[int]):
+    print(
+        f"{'size':>6} {'format':>8} {'save ms':>9} {'load ms':>9} "
+        f"{'touch ms':>9} {'size KiB':>9}"
+    )
+    with tempfile.TemporaryDirectory() as folder:
+        for size in sizes:
+            grid = make_city(size)
+            codes = grid.to_codes()
+            formats = [
+                ("txt", "txt", save_grid_as_txt, load_grid_from_txt, {}),
+                ("bin", "bin", save_grid_as_bin, load_grid_from_bin, {}),
+                ("bin+zlib", "bin", save_grid_as_bin, load_grid_from_bin, {"compress": True}),
+            ]
+            for name, extension, save, load, options in formats:
+                path = os.path.join(folder, f"grid_{size}.{extension}")
+                _, save_time = timed(save, grid, path, **options)
+                loaded, load_time = timed(load, None, 1, path)
+                # a memory-mapped load only pays for the pages once they are read
+                same, touch_time = timed(np.array_equal, loaded.to_codes(), codes)
+                assert same
+                print(
+                    f"{size:>6} {name:>8} {save_time * 1000:>9.1f} {load_time * 1000:>9.1f} "
+                    f"{touch_time * 1000:>9.1f} {os.path.getsize(path) / 1024:>9.1f}"
+                )
+                del loaded
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [100, 500, 2000])
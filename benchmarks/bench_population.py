@@ -0,0 +1,41 @@
+"""
+    Times generate_population on a generated city large enough to house every
+    person, label_blocks is reported separately as it only depends on the map
+
+    Usage: python -m benchmarks.bench_population [sizes...]
+"""
+import contextlib
+import io
+import math
+import sys
+import time
+
+from benchmarks.city import generate_city
+from components.profiling import Profiler
+from components.simulation import Simulation
+
+# about a third of the cells of a generated city are houses
+CELLS_PER_PERSON = 4
+
+
+def main(sizes: list[int]):
+    print(f"{'people':>10} {'map':>6} {'total s':>9} {'labelling s':>12} {'MB':>8}")
+    for size in sizes:
+        side = math.isqrt(size * CELLS_PER_PERSON) + 1
+        simulation = Simulation(generate_city(side, seed=0), 0)
+        simulation.profiler = Profiler()
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            simulation.generate_population(size)
+        elapsed = time.perf_counter() - start
+        labelling = simulation.profiler.timings["label_blocks"].total
+        assert len(simulation.people) == size
+        print(
+            f"{size:>10} {side:>6} {elapsed:>9.2f} {labelling:>12.2f} "
+            f"{simulation.people.nbytes() / 2**20:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
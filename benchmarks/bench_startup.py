@@ -0,0 +1,106 @@
+"""
+    Times block labelling and entry road lookups, the startup work of
+    generate_population, for the recursive flood fills they replaced and
+    the array based engine in components.labelling
+
+    Usage: python -m benchmarks.bench_startup [sizes...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.city import make_city
+from components.grid import Grid, GridState
+from components.labelling import closest_road, label_blocks
+
+
+def legacy_label_blocks(grid: Grid) -> list[list[int]]:
+    # the recursive flood fill that used to live in generate_population
+    blocks = [[-1 for _ in range(grid.cols)] for _ in range(grid.rows)]
+
+    def dfs(c, r, block_id):
+        if (
+            not grid.check_in_bounds(c, r)
+            or blocks[r][c] != -1
+            or grid[r, c] == GridState.EMPTY
+        ):
+            return
+        if grid[r, c] == GridState.ROAD:
+            return
+        blocks[r][c] = block_id
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            dfs(c + dx, r + dy, block_id)
+
+    block_id = 0
+    for r in range(grid.rows):
+        for c in range(grid.cols):
+            if blocks[r][c] != -1 or grid[r, c] in [GridState.EMPTY, GridState.ROAD]:
+                continue
+            dfs(c, r, block_id)
+            block_id += 1
+    return blocks
+
+
+def legacy_closest_road(grid: Grid, loc):
+    # the recursive search that used to be Simulation.get_closest_road
+    def dfs(r, c, self_state, visited):
+        if not grid.check_in_bounds(c, r) or (r, c) in visited:
+            return None
+        if grid[r, c] == GridState.ROAD:
+            return r, c
+        if grid[r, c] != self_state:
+            return None
+        visited.add((r, c))
+        for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
+            point = dfs(r + dy, c + dx, self_state, visited)
+            if point is not None:
+                return point
+
+    r, c = loc
+    return dfs(r, c, grid[r, c], set())
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    try:
+        return fn(*args), time.perf_counter() - start
+    except RecursionError:
+        return None, None
+
+
+def main(sizes: list[int], spacings: tuple[int, ...] = (5, 40)):
+    print(
+        f"{'size':>6} {'spacing':>8} {'legacy label ms':>16} {'label ms':>9} "
+        f"{'legacy roads ms':>16} {'roads ms':>9}"
+    )
+    for size in sizes:
+        for spacing in spacings:
+            grid = make_city(size, spacing=spacing)
+            codes = grid.to_codes()
+
+            legacy, legacy_time = timed(legacy_label_blocks, grid)
+            labels, label_time = timed(label_blocks, codes)
+            if legacy is not None:
+                assert np.array_equal(np.array(legacy), labels.labels)
+
+            places = list(zip(*np.nonzero(labels.labels >= 0)))[:: max(1, spacing // 4)]
+            places = [(int(r), int(c)) for r, c in places[:2000]]
+            legacy_roads, legacy_road_time = timed(
+                lambda: [legacy_closest_road(grid, loc) for loc in places]
+            )
+            roads, road_time = timed(lambda: [closest_road(codes, loc) for loc in places])
+            if legacy_roads is not None:
+                assert legacy_roads == roads
+
+            def ms(t):
+                return "recursion" if t is None else f"{t * 1000:.1f}"
+
+            print(
+                f"{size:>6} {spacing:>8} {ms(legacy_time):>16} {ms(label_time):>9} "
+                f"{ms(legacy_road_time):>16} {ms(road_time):>9}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [100, 300, 1000])
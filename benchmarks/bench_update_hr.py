@@ -0,0 +1,108 @@
+"""
+    Times the batched hourly update (PopulationArrays.update) against calling
+    Person.update on every person, and checks both give identical arrays
+
+    Usage: python -m benchmarks.bench_update_hr [sizes...]
+"""
+import sys
+import time
+
+import numpy as np
+
+from components.person import Day, PersonState
+from components.population import NUM_DAYS, PopulationArrays
+
+HOURS = 48
+# the per object loop is only timed up to this size, it takes minutes at 1M
+OBJECT_LIMIT = 100_000
+
+
+def make_population(size: int, seed: int = 0) -> PopulationArrays:
+    # home -> place -> home on every day, like generate_population
+    rng = np.random.default_rng(seed)
+    stops = 3
+    home = rng.integers(0, 1000, size=(size, 2))
+    place = rng.integers(0, 1000, size=(size, NUM_DAYS, 2))
+    sched_row = np.empty((size, NUM_DAYS, stops), dtype=np.int32)
+    sched_col = np.empty((size, NUM_DAYS, stops), dtype=np.int32)
+    sched_row[:, :, [0, 2]] = home[:, None, None, 0]
+    sched_col[:, :, [0, 2]] = home[:, None, None, 1]
+    sched_row[:, :, 1] = place[:, :, 0]
+    sched_col[:, :, 1] = place[:, :, 1]
+    sched_time = np.empty((size, NUM_DAYS, stops), dtype=np.int32)
+    sched_time[:, :, 0] = rng.integers(4, 9, size=(size, NUM_DAYS))
+    sched_time[:, :, 1] = rng.integers(2, 13, size=(size, NUM_DAYS))
+    sched_time[:, :, 2] = -1
+    offsets = np.arange(size * NUM_DAYS + 1, dtype=np.int64) * stops
+    return PopulationArrays(
+        offsets,
+        sched_row.ravel(),
+        sched_col.ravel(),
+        sched_time.ravel(),
+        home[:, 0],
+        home[:, 1],
+    )
+
+
+def teleport(population: PopulationArrays, rng: np.random.Generator, day: Day):
+    # stand in for update_min: drop half of the moving people on their next stop
+    moving = np.flatnonzero(population.state == PersonState.Moving.value)
+    moving = moving[rng.random(len(moving)) < 0.5]
+    stop = population.sched_offsets[moving * NUM_DAYS + day.value]
+    stop += population.current_idx[moving] + 1
+    population.row[moving] = population.sched_row[stop]
+    population.col[moving] = population.sched_col[stop]
+
+
+def run(population: PopulationArrays, batched: bool) -> float:
+    rng = np.random.default_rng(1)
+    elapsed = 0.0
+    day = Day.Monday
+    for hour in range(1, HOURS + 1):
+        start = time.perf_counter()
+        if batched:
+            population.update(day)
+        else:
+            for person in population:
+                person.update(day)
+        elapsed += time.perf_counter() - start
+        teleport(population, rng, day)
+        if hour % 24 == 0:
+            day = Day((day.value + 1) % NUM_DAYS)
+            population.day_changed(day)
+    return elapsed
+
+
+def snapshot(population: PopulationArrays):
+    return [
+        arr.copy()
+        for arr in (
+            population.row,
+            population.col,
+            population.state,
+            population.current_idx,
+            population.time,
+        )
+    ]
+
+
+def main(sizes: list[int]):
+    print(f"{'agents':>9} {'per object ms/h':>16} {'batched ms/h':>13} {'speed-up':>9}")
+    for size in sizes:
+        batched = make_population(size)
+        batched_ms = run(batched, batched=True) * 1000 / HOURS
+        if size > OBJECT_LIMIT:
+            print(f"{size:>9} {'-':>16} {batched_ms:>13.2f} {'-':>9}")
+            continue
+
+        objects = make_population(size)
+        object_ms = run(objects, batched=False) * 1000 / HOURS
+        for a, b in zip(snapshot(batched), snapshot(objects)):
+            assert np.array_equal(a, b), "batched update differs from Person.update"
+        print(
+            f"{size:>9} {object_ms:>16.2f} {batched_ms:>13.2f} {object_ms / batched_ms:>8.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main([int(s) for s in sys.argv[1:]] or [10_000, 100_000, 1_000_000])
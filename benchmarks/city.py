@@ -0,0 +1,89 @@
+import random
+
+import numpy as np
+
+from components.grid import GRID_CODES, ArrayGrid, GridState
+
+BUILDINGS = [
+    GridState.HOUSE,
+    GridState.HOUSE,
+    GridState.OFFICE,
+    GridState.MALL,
+    GridState.SCHOOL,
+    GridState.PARK,
+]
+
+
+def make_city(size: int, spacing: int = 5, seed: int = 0) -> ArrayGrid:
+    """
+        Builds a square city: a road lattice every `spacing` cells with every
+        enclosed plot filled by one random building type
+    """
+    rng = random.Random(seed)
+    grid = ArrayGrid(size, size, 1, None)
+    for i in range(0, size, spacing):
+        grid.place_blocks((0, i), (size - 1, i), GridState.ROAD)
+        grid.place_blocks((i, 0), (i, size - 1), GridState.ROAD)
+
+    for y in range(1, size, spacing):
+        for x in range(1, size, spacing):
+            x2 = min(x + spacing - 2, size - 1)
+            y2 = min(y + spacing - 2, size - 1)
+            grid.place_blocks((x, y), (x2, y2), rng.choice(BUILDINGS))
+    return grid
+
+
+# building mix of every district kind as (state, weight)
+DISTRICTS = {
+    "residential": [(GridState.HOUSE, 8), (GridState.PARK, 1), (GridState.SCHOOL, 1)],
+    "commercial": [(GridState.OFFICE, 5), (GridState.MALL, 3), (GridState.HOUSE, 2)],
+    "mixed": [
+        (GridState.HOUSE, 4),
+        (GridState.OFFICE, 2),
+        (GridState.MALL, 1),
+        (GridState.SCHOOL, 1),
+        (GridState.PARK, 1),
+    ],
+}
+
+
+def generate_city(
+    size: int,
+    road_spacing: int = 5,
+    density: float = 1.0,
+    districts: int = 4,
+    seed: int = 0,
+) -> ArrayGrid:
+    """
+        Procedural city: a road lattice every `road_spacing` cells, the map
+        split into districts x districts squares that each get a district
+        kind, and every plot between the roads built with a building of its
+        district's mix, the same arguments always give the same city
+        Parameters:
+            - density: chance of a plot being built, the rest stays empty
+            - districts: number of districts along each side
+    """
+    rng = np.random.default_rng(seed)
+    codes = np.zeros((size, size), dtype=np.uint8)
+    codes[::road_spacing, :] = GRID_CODES[GridState.ROAD]
+    codes[:, ::road_spacing] = GRID_CODES[GridState.ROAD]
+
+    kinds = list(DISTRICTS)
+    district_kind = rng.integers(0, len(kinds), size=(districts, districts))
+    mixes = []
+    for kind in kinds:
+        states, weights = zip(*DISTRICTS[kind])
+        weights = np.array(weights, dtype=float)
+        mixes.append(([GRID_CODES[state] for state in states], weights / weights.sum()))
+
+    district_size = max(size / districts, 1)
+    for y in range(1, size, road_spacing):
+        for x in range(1, size, road_spacing):
+            if rng.random() >= density:
+                continue
+            kind = district_kind[
+                min(int(y / district_size), districts - 1), min(int(x / district_size), districts - 1)
+            ]
+            states, weights = mixes[kind]
+            codes[y : y + road_spacing - 1, x : x + road_spacing - 1] = rng.choice(states, p=weights)
+    return ArrayGrid.from_codes(codes, 1, None)
@@ -0,0 +1,199 @@
+"""
+    Reproducible benchmarks of the hot paths on generated cities, every run
+    uses the same seed so results of two runs are directly comparable
+
+    Usage:
+        python -m benchmarks.suite [--scales small medium] [--out results.json]
+                                   [--baseline old.json] [--tolerance 0.25]
+
+    Results are written as JSON, with --baseline every benchmark is compared
+    to the same benchmark of an earlier run and slowdowns above the
+    tolerance are reported, the exit code is 1 when there is any
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from datetime import datetime
+
+import numpy as np
+
+from benchmarks.city import generate_city
+from components.grid import ArrayGrid, load_grid_from_txt, save_grid_as_txt
+from components.simulation import Simulation
+
+SEED = 1234
+MINUTES_PER_DAY = 24 * 60
+
+# map side and population of every scale
+SCALES = {
+    "small": (50, 200),
+    "medium": (100, 500),
+    "large": (200, 1000),
+}
+
+
+def timed(fn: Callable[[], object], repeats: int, setup: Callable[[], object] | None = None) -> list[float]:
+    # seconds of every repeat, setup runs untimed before each one
+    times = []
+    for _ in range(repeats):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def make_simulation(grid: ArrayGrid, population: int) -> Simulation:
+    simulation = Simulation(grid, SEED)
+    simulation.generate_population(population)
+    return simulation
+
+
+def bench_generate_population(grid: ArrayGrid, population: int, repeats: int) -> list[float]:
+    return timed(lambda: make_simulation(grid, population), repeats)
+
+
+def bench_a_star(grid: ArrayGrid, population: int, repeats: int, pairs: int = 50) -> list[float]:
+    # seconds per search over a fixed set of (entry road, destination) pairs
+    simulation = Simulation(grid, SEED)
+    simulation.label_blocks()
+    rng = random.Random(SEED)
+    codes = grid.to_codes()
+    places = list(zip(*np.nonzero(codes > 1)))
+    trips = []
+    for _ in range(pairs):
+        src = simulation.get_entry_road(tuple(map(int, rng.choice(places))))
+        dest = tuple(map(int, rng.choice(places)))
+        trips.append((src, dest))
+    times = timed(lambda: [simulation.get_a_star_path(src, dest) for src, dest in trips], repeats)
+    return [t / pairs for t in times]
+
+
+def bench_update_min_day(grid: ArrayGrid, population: int, repeats: int) -> list[float]:
+    simulation = None
+
+    def setup():
+        nonlocal simulation
+        simulation = make_simulation(grid, population)
+
+    def run():
+        for _ in range(MINUTES_PER_DAY):
+            simulation.update_min()
+
+    return timed(run, repeats, setup)
+
+
+def bench_load_grid_from_txt(grid: ArrayGrid, population: int, repeats: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, "city.txt")
+        save_grid_as_txt(grid, path)
+        return timed(lambda: load_grid_from_txt(None, 1, path, grid_cls=ArrayGrid), repeats)
+
+
+def bench_draw_grid(grid: ArrayGrid, population: int, repeats: int, frames: int = 10) -> list[float]:
+    # seconds per frame of an idle map drawn offscreen, after the first draw
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+
+    block = 20
+    grid = ArrayGrid.from_codes(grid.to_codes().copy(), block, None)
+    grid.surface = pygame.Surface((grid.cols * block, grid.rows * block))
+    grid.draw_grid()
+    times = timed(lambda: [grid.draw_grid() for _ in range(frames)], repeats)
+    return [t / frames for t in times]
+
+
+BENCHMARKS: dict[str, Callable[[ArrayGrid, int, int], list[float]]] = {
+    "generate_population": bench_generate_population,
+    "get_a_star_path": bench_a_star,
+    "update_min_day": bench_update_min_day,
+    "load_grid_from_txt": bench_load_grid_from_txt,
+    "draw_grid": bench_draw_grid,
+}
+
+
+def run_suite(scales: list[str], names: list[str], repeats: int) -> dict:
+    results = {}
+    for scale in scales:
+        size, population = SCALES[scale]
+        grid = generate_city(size, density=0.9, seed=SEED)
+        for name in names:
+            times = BENCHMARKS[name](grid, population, repeats)
+            key = f"{name}[{scale}]"
+            results[key] = {
+                "median_s": statistics.median(times),
+                "min_s": min(times),
+                "repeats": len(times),
+                "size": size,
+                "population": population,
+            }
+            print(f"{key:<36} {statistics.median(times) * 1000:>12.3f} ms")
+    return {
+        "meta": {
+            "seed": SEED,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "platform": platform.platform(),
+        },
+        "results": results,
+    }
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list[str]:
+    # names of the benchmarks that got slower than the baseline by more than
+    # tolerance, the fastest repeats are compared as they are the least noisy
+    regressions = []
+    print(f"\n{'benchmark':<36} {'baseline ms':>12} {'now ms':>12} {'ratio':>7}")
+    for key, result in results["results"].items():
+        old = baseline["results"].get(key)
+        if old is None:
+            continue
+        ratio = result["min_s"] / old["min_s"] if old["min_s"] else float("inf")
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(key)
+            flag = "  slower"
+        print(
+            f"{key:<36} {old['min_s'] * 1000:>12.3f} {result['min_s'] * 1000:>12.3f} "
+            f"{ratio:>7.2f}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the benchmark suite")
+    parser.add_argument("--scales", nargs="+", choices=list(SCALES), default=["small", "medium"])
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", help="write the results to this json file")
+    parser.add_argument("--baseline", help="json results of an earlier run to compare with")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.25, help="allowed slowdown against the baseline"
+    )
+    args = parser.parse_args()
+
+    results = run_suite(args.scales, args.only, args.repeats)
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} benchmarks slower than the baseline")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+from components.grid import Grid, encode_codes
+
+AUTOSAVE_SUFFIX = ".autosave.bin"
+
+
+class AutoSaver:
+    """
+        Saves the grid in the background without stalling the game loop
+        - the grid is only snapshotted when it changed since the last save,
+          a snapshot is a copy of the uint8 codes
+        - a worker thread encodes and writes the snapshot to a temporary file
+          and renames it into place, a crash never leaves a half written save
+        - only the newest `keep` autosaves are kept, other saves are untouched
+        Autosaves are named grid_<timestamp>.autosave.bin so the latest one is
+        picked up by load_grid_from_file on the next start
+        Methods:
+        - request_save : snapshot the grid and queue it, called from a Timer
+        - close : write any queued snapshot and stop the worker
+    """
+
+    def __init__(self, grid: Grid, folder: str = "saves", keep: int = 5, compress: bool = False):
+        """
+            Parameters:
+                - folder: where autosaves are written
+                - keep: number of autosaves kept on disk
+                - compress: zlib the saves, smaller but slower to write
+        """
+        self.grid = grid
+        self.folder = folder
+        self.keep = keep
+        self.compress = compress
+        self.dirty = False
+        grid.add_listener(self.on_grid_change)
+
+        # metrics
+        self.saves = 0
+        self.skipped = 0
+        self.bytes_written = 0
+        self.snapshot_time = 0.0
+        self.last_latency = 0.0
+        self.total_latency = 0.0
+
+        # the newest snapshot waiting for the worker, older ones are dropped
+        self.pending: np.ndarray | None = None
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.idle = threading.Event()
+        self.idle.set()
+        self.closed = False
+        self.worker = threading.Thread(target=self.run, name="autosave", daemon=True)
+        self.worker.start()
+
+    def on_grid_change(self, x1: int, y1: int, x2: int, y2: int):
+        self.dirty = True
+
+    def request_save(self) -> bool:
+        # returns False when the grid is unchanged and nothing was queued
+        if not self.dirty or self.closed:
+            self.skipped += 1
+            return False
+        start = time.perf_counter()
+        snapshot = self.grid.to_codes().copy()
+        self.dirty = False
+        self.snapshot_time = time.perf_counter() - start
+        with self.lock:
+            self.pending = snapshot
+            self.idle.clear()
+        self.wake.set()
+        return True
+
+    def run(self):
+        while True:
+            self.wake.wait()
+            self.wake.clear()
+            with self.lock:
+                snapshot, self.pending = self.pending, None
+            if snapshot is not None:
+                self.write(snapshot)
+            with self.lock:
+                if self.pending is None:
+                    self.idle.set()
+            if self.closed and self.pending is None:
+                return
+
+    def write(self, codes: np.ndarray):
+        start = time.perf_counter()
+        os.makedirs(self.folder, exist_ok=True)
+        data = encode_codes(codes, self.compress)
+
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        path = os.path.join(self.folder, f"grid_{ts}{AUTOSAVE_SUFFIX}")
+        tmp = os.path.join(self.folder, f".grid_{ts}{AUTOSAVE_SUFFIX}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self.rotate()
+
+        self.last_latency = time.perf_counter() - start
+        self.total_latency += self.last_latency
+        self.bytes_written += len(data)
+        self.saves += 1
+
+    def rotate(self):
+        # timestamped names sort oldest first
+        saves = sorted(
+            f for f in os.listdir(self.folder) if f.startswith("grid_") and f.endswith(AUTOSAVE_SUFFIX)
+        )
+        for name in saves[: max(len(saves) - self.keep, 0)]:
+            os.remove(os.path.join(self.folder, name))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        # waits for queued snapshots to be written
+        return self.idle.wait(timeout)
+
+    def close(self):
+        self.closed = True
+        self.wake.set()
+        self.worker.join()
+        self.grid.remove_listener(self.on_grid_change)
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "saves": self.saves,
+            "skipped": self.skipped,
+            "bytes_written": self.bytes_written,
+            "snapshot_ms": self.snapshot_time * 1000,
+            "last_latency_ms": self.last_latency * 1000,
+            "mean_latency_ms": self.total_latency / self.saves * 1000 if self.saves else 0.0,
+        }
@@ -0,0 +1,208 @@
+import json
+import os
+import shutil
+
+import numpy as np
+
+from components.disease import Disease, DiseaseParams
+from components.grid import ArrayGrid, Grid
+from components.path_cache import Route, Trip
+from components.person import Day
+from components.population import PopulationArrays
+from components.scheduler import EventScheduler
+from components.simulation import Simulation
+
+CHECKPOINT_VERSION = 1
+
+PEOPLE_ARRAYS = (
+    "sched_offsets",
+    "sched_row",
+    "sched_col",
+    "sched_time",
+    "row",
+    "col",
+    "state",
+    "current_idx",
+    "time",
+)
+
+
+def save_checkpoint(simulation: Simulation, folder: str):
+    """
+        Writes the full state of a simulation to `folder`: the grid, the
+        people arrays, the clock, every random generator, the trips in
+        progress, the shared route cache, the event scheduler and the disease
+        Arrays are plain .npy files so a restore can memory-map them, the
+        rest goes to meta.json, the folder is replaced atomically
+    """
+    tmp = f"{folder}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    def save(name: str, arr):
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arr))
+
+    save("grid", simulation.grid.to_codes())
+    people = simulation.people
+    for name in PEOPLE_ARRAYS:
+        save(f"people_{name}", getattr(people, name))
+
+    # every distinct route once, trips and cache entries point at them
+    routes: list[Route] = []
+    route_ids: dict[int, int] = {}
+
+    def route_id(route: Route) -> int:
+        if id(route) not in route_ids:
+            route_ids[id(route)] = len(routes)
+            routes.append(route)
+        return route_ids[id(route)]
+
+    trips = sorted(simulation.path_cache.items())
+    save(
+        "trips",
+        np.array(
+            [(i, route_id(t.route), t.dest[0], t.dest[1], t.cursor) for i, t in trips],
+            dtype=np.int64,
+        ).reshape(-1, 5),
+    )
+    # oldest first so the LRU order survives
+    cached = list(simulation.route_cache.routes.items())
+    save(
+        "route_cache",
+        np.array(
+            [(r, c, block, route_id(route)) for ((r, c), block), route in cached],
+            dtype=np.int64,
+        ).reshape(-1, 4),
+    )
+    save("route_offsets", np.cumsum([0] + [len(route) for route in routes]))
+    save("route_cells", np.array([cell for route in routes for cell in route], dtype=np.int32).reshape(-1, 2))
+
+    meta = {
+        "version": CHECKPOINT_VERSION,
+        "grid_size": simulation.grid.grid_size,
+        "hrs": simulation.hrs,
+        "secs": simulation.secs,
+        "day": simulation.day.value,
+        "rng": _encode_random_state(simulation.rng.getstate()),
+        "route_table": simulation.route_table is not None,
+        "route_cache": {
+            "max_entries": simulation.route_cache.max_entries,
+            "max_cells": simulation.route_cache.max_cells,
+        },
+        "events": simulation.scheduler is not None,
+        "disease": None,
+    }
+
+    scheduler = simulation.scheduler
+    if scheduler is not None:
+        save("scheduler_wake", scheduler.wake)
+        save("scheduler_since", scheduler.since)
+        save("scheduler_wheel_offsets", np.cumsum([0] + [len(slot) for slot in scheduler.wheel]))
+        save("scheduler_wheel", np.array([i for slot in scheduler.wheel for i in slot], dtype=np.int64))
+        save("scheduler_movers", np.array(sorted(scheduler.movers), dtype=np.int64))
+
+    disease = simulation.disease
+    if disease is not None:
+        save("disease_state", disease.state)
+        save("disease_timer", disease.timer)
+        meta["disease"] = {
+            "params": vars(disease.params),
+            "seed": disease.seed,
+            "hours": disease.hours,
+            "rng": disease.rng.bit_generator.state,
+        }
+
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    # swap the folders so a crash leaves either the old or the new checkpoint
+    old = f"{folder}.old"
+    if os.path.exists(folder):
+        shutil.rmtree(old, ignore_errors=True)
+        os.replace(folder, old)
+    os.replace(tmp, folder)
+    shutil.rmtree(old, ignore_errors=True)
+
+
+def load_checkpoint(folder: str, surface=None, grid_cls: type[Grid] = ArrayGrid) -> Simulation:
+    """
+        Rebuilds the simulation saved by save_checkpoint, it continues with
+        exactly the trajectory the saved one would have had
+        The grid and the people arrays are memory-mapped copy on write, pages
+        are only read when touched and the files are never modified
+    """
+    with open(os.path.join(folder, "meta.json")) as f:
+        meta = json.load(f)
+    if meta["version"] > CHECKPOINT_VERSION:
+        raise ValueError(f"{folder} has unsupported checkpoint version {meta['version']}")
+
+    def load(name: str) -> np.ndarray:
+        return np.load(os.path.join(folder, f"{name}.npy"), mmap_mode="c")
+
+    grid = grid_cls.from_codes(load("grid"), meta["grid_size"], surface)
+    simulation = Simulation(grid)
+    simulation.label_blocks()
+
+    arrays = {name: load(f"people_{name}") for name in PEOPLE_ARRAYS}
+    people = PopulationArrays(
+        arrays["sched_offsets"],
+        arrays["sched_row"],
+        arrays["sched_col"],
+        arrays["sched_time"],
+        arrays["row"],
+        arrays["col"],
+    )
+    people.state = arrays["state"]
+    people.current_idx = arrays["current_idx"]
+    people.time = arrays["time"]
+    simulation.people = people
+    simulation.rebuild_spatial_index()
+
+    simulation.hrs, simulation.secs = meta["hrs"], meta["secs"]
+    simulation.day = Day(meta["day"])
+    simulation.rng.setstate(_decode_random_state(meta["rng"]))
+    if meta["route_table"]:
+        simulation.precompute_routes()
+
+    offsets = np.load(os.path.join(folder, "route_offsets.npy")).tolist()
+    cells = [tuple(cell) for cell in np.load(os.path.join(folder, "route_cells.npy")).tolist()]
+    routes = [tuple(cells[start:end]) for start, end in zip(offsets, offsets[1:])]
+
+    cache = simulation.route_cache
+    cache.max_entries = meta["route_cache"]["max_entries"]
+    cache.max_cells = meta["route_cache"]["max_cells"]
+    for r, c, block, route in np.load(os.path.join(folder, "route_cache.npy")).tolist():
+        cache.put(((r, c), block), routes[route])
+    for i, route, dest_r, dest_c, cursor in np.load(os.path.join(folder, "trips.npy")).tolist():
+        simulation.path_cache[i] = Trip(routes[route], (dest_r, dest_c), cursor)
+
+    if meta["events"]:
+        scheduler = EventScheduler(simulation)
+        scheduler.wake[:] = load("scheduler_wake")
+        scheduler.since[:] = load("scheduler_since")
+        wheel = np.load(os.path.join(folder, "scheduler_wheel.npy")).tolist()
+        bounds = np.load(os.path.join(folder, "scheduler_wheel_offsets.npy")).tolist()
+        scheduler.wheel = [wheel[start:end] for start, end in zip(bounds, bounds[1:])]
+        scheduler.movers = set(np.load(os.path.join(folder, "scheduler_movers.npy")).tolist())
+        simulation.scheduler = scheduler
+
+    saved = meta["disease"]
+    if saved is not None:
+        disease = Disease(simulation, DiseaseParams(**saved["params"]), saved["seed"])
+        disease.state = load("disease_state")
+        disease.timer = load("disease_timer")
+        disease.hours = saved["hours"]
+        disease.rng.bit_generator.state = saved["rng"]
+        simulation.disease = disease
+    return simulation
+
+
+def _encode_random_state(state: tuple) -> list:
+    # random.Random.getstate() as json friendly lists
+    version, internal, gauss = state
+    return [version, list(internal), gauss]
+
+
+def _decode_random_state(state: list) -> tuple:
+    version, internal, gauss = state
+    return version, tuple(internal), gauss
@@ -0,0 +1,124 @@
+from dataclasses import dataclass
+from enum import Enum, unique
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+if TYPE_CHECKING:
+    from components.simulation import Simulation
+
+
+@unique
+class HealthState(Enum):
+    Susceptible = 0
+    Exposed = 1
+    Infectious = 2
+    Recovered = 3
+
+
+@dataclass
+class DiseaseParams:
+    """
+        Attributes:
+            - beta: hourly infection pressure of a block made only of infectious people
+            - incubation_hours: mean hours from exposure to becoming infectious
+            - infectious_hours: mean hours from becoming infectious to recovery
+            - initial_infected: people infectious at the start
+    """
+
+    beta: float = 0.05
+    incubation_hours: float = 48
+    infectious_hours: float = 120
+    initial_infected: int = 10
+
+
+class Disease:
+    """
+        SEIR layer on top of the mobility model, stepped once per simulated hour
+        People only infect each other inside the same block, every block is
+        well mixed: a susceptible person in block b is exposed with chance
+        1 - exp(-beta * I_b / N_b), I_b infectious out of N_b people there
+        The new exposures of every block are one binomial draw and the
+        exposed people are picked by sorting on random keys, so an hour costs
+        a few passes over the population and never looks at pairs of people
+        Attributes (one entry per person):
+            - state: HealthState values
+            - timer: hours left in the exposed or infectious stage
+    """
+
+    def __init__(self, simulation: "Simulation", params: DiseaseParams, seed: int | None = None):
+        self.simulation = simulation
+        self.params = params
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        size = len(simulation.people)
+        self.state = np.full(size, HealthState.Susceptible.value, dtype=np.int8)
+        self.timer = np.zeros(size, dtype=np.int32)
+        self.hours = 0
+        self.infect(self.rng.permutation(size)[: params.initial_infected])
+
+    def stage_hours(self, mean: float, count: int) -> np.ndarray:
+        # geometric stage lengths with the given mean, at least one hour
+        return self.rng.geometric(min(1 / max(mean, 1), 1), size=count).astype(np.int32)
+
+    def expose(self, people: np.ndarray):
+        self.state[people] = HealthState.Exposed.value
+        self.timer[people] = self.stage_hours(self.params.incubation_hours, len(people))
+
+    def infect(self, people: np.ndarray):
+        self.state[people] = HealthState.Infectious.value
+        self.timer[people] = self.stage_hours(self.params.infectious_hours, len(people))
+
+    def step_hour(self):
+        self.hours += 1
+        self.progress()
+        self.transmit()
+
+    def progress(self):
+        # exposed become infectious and infectious recover when their timer runs out
+        sick = (self.state == HealthState.Exposed.value) | (self.state == HealthState.Infectious.value)
+        self.timer[sick] -= 1
+        done = sick & (self.timer <= 0)
+        recovering = np.flatnonzero(done & (self.state == HealthState.Infectious.value))
+        incubated = np.flatnonzero(done & (self.state == HealthState.Exposed.value))
+        self.state[recovering] = HealthState.Recovered.value
+        self.infect(incubated)
+
+    def transmit(self) -> int:
+        # returns the number of people exposed this hour
+        block = self.simulation.spatial_index.person_block
+        num_blocks = len(self.simulation.spatial_index.block_head)
+        if not num_blocks:
+            return 0
+        in_block = block >= 0
+        infectious = in_block & (self.state == HealthState.Infectious.value)
+        present = np.bincount(block[in_block], minlength=num_blocks)
+        sources = np.bincount(block[infectious], minlength=num_blocks)
+        if not sources.any():
+            return 0
+
+        susceptible = np.flatnonzero(
+            in_block & (self.state == HealthState.Susceptible.value) & (sources[np.maximum(block, 0)] > 0)
+        )
+        if not len(susceptible):
+            return 0
+        exposed_blocks = block[susceptible]
+        at_risk = np.bincount(exposed_blocks, minlength=num_blocks)
+        pressure = self.params.beta * sources / np.maximum(present, 1)
+        new_cases = self.rng.binomial(at_risk, -np.expm1(-pressure))
+        if not new_cases.any():
+            return 0
+
+        # the first new_cases[b] susceptible people of block b in a random order
+        keys = exposed_blocks.astype(np.int64) << 32 | self.rng.integers(0, 1 << 32, len(susceptible))
+        order = np.argsort(keys)
+        susceptible, exposed_blocks = susceptible[order], exposed_blocks[order]
+        group_start = np.cumsum(at_risk) - at_risk
+        rank = np.arange(len(susceptible)) - group_start[exposed_blocks]
+        picked = susceptible[rank < new_cases[exposed_blocks]]
+        self.expose(picked)
+        return len(picked)
+
+    def counts(self) -> dict[HealthState, int]:
+        totals = np.bincount(self.state, minlength=len(HealthState))
+        return {state: int(totals[state.value]) for state in HealthState}
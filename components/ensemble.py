@@ -0,0 +1,142 @@
+import time
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from components.grid import ArrayGrid, Grid
+from components.person import PersonState
+from components.runner import simulate
+from components.simulation import Simulation
+from const import BLOCK_SIZE
+
+
+@dataclass(frozen=True)
+class Replica:
+    index: int
+    seed: int
+    days: int
+    population: int | None = None
+    precompute_routes: bool = False
+    events: bool = False
+
+
+@dataclass
+class ReplicaSummary:
+    """
+        The few numbers a replica sends back instead of its agent state
+    """
+
+    index: int
+    seed: int
+    population: int
+    minutes: int
+    setup_time: float
+    elapsed: float
+    staying: int
+    moving: int
+    mean_stop: float
+    route_hit_rate: float
+
+    @property
+    def minutes_per_second(self) -> float:
+        return self.minutes / self.elapsed if self.elapsed else float("inf")
+
+
+def make_replicas(
+    count: int,
+    days: int,
+    base_seed: int = 0,
+    populations: list[int | None] | None = None,
+    precompute_routes: bool = False,
+    events: bool = False,
+) -> list[Replica]:
+    """
+        Builds `count` replicas with independent seeds derived from base_seed,
+        the same base seed always gives the same replica seeds
+        Parameters:
+            - populations: population sizes handed out to replicas in turn
+    """
+    populations = populations or [None]
+    seeds = np.random.SeedSequence(base_seed).spawn(count)
+    return [
+        Replica(
+            i,
+            int(seed.generate_state(1)[0]),
+            days,
+            populations[i % len(populations)],
+            precompute_routes,
+            events,
+        )
+        for i, seed in enumerate(seeds)
+    ]
+
+
+# the shared grid of a worker process, set by _attach_grid
+_shared_grid: tuple[shared_memory.SharedMemory, np.ndarray] | None = None
+
+
+def _attach_grid(name: str, shape: tuple[int, int]):
+    global _shared_grid
+    shm = shared_memory.SharedMemory(name=name)
+    codes = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    codes.flags.writeable = False
+    _shared_grid = shm, codes
+
+
+def _run_replica(replica: Replica) -> ReplicaSummary:
+    assert _shared_grid is not None
+    _, codes = _shared_grid
+    start = time.perf_counter()
+    # the grid wraps the shared read-only codes, nothing is copied
+    grid = ArrayGrid.from_codes(codes, BLOCK_SIZE, None)
+    simulation = Simulation(grid, replica.seed)
+    simulation.generate_population(replica.population)
+    if replica.precompute_routes:
+        simulation.precompute_routes()
+    simulation.use_events(replica.events)
+    setup_time = time.perf_counter() - start
+    minutes, elapsed = simulate(simulation, replica.days)
+
+    if simulation.scheduler is not None:
+        simulation.scheduler.sync()
+    people = simulation.people
+    return ReplicaSummary(
+        index=replica.index,
+        seed=replica.seed,
+        population=len(people),
+        minutes=minutes,
+        setup_time=setup_time,
+        elapsed=elapsed,
+        staying=int((people.state == PersonState.Staying.value).sum()),
+        moving=int((people.state == PersonState.Moving.value).sum()),
+        mean_stop=float(people.current_idx.mean()) if len(people) else 0.0,
+        route_hit_rate=simulation.route_cache.stats()["hit_rate"],
+    )
+
+
+def run_ensemble(
+    grid: Grid, replicas: list[Replica], processes: int | None = None
+) -> Iterator[ReplicaSummary]:
+    """
+        Runs every replica on a process pool and yields their summaries as
+        they finish, the grid is copied once into shared memory and every
+        worker reads it from there
+    """
+    codes = grid.to_codes()
+    shm = shared_memory.SharedMemory(create=True, size=max(codes.nbytes, 1))
+    try:
+        np.ndarray(codes.shape, dtype=np.uint8, buffer=shm.buf)[:] = codes
+        with ProcessPoolExecutor(
+            max_workers=processes,
+            initializer=_attach_grid,
+            initargs=(shm.name, codes.shape),
+        ) as pool:
+            futures = [pool.submit(_run_replica, replica) for replica in replicas]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        shm.close()
+        shm.unlink()
@@ -1,7 +1,11 @@
 import os
+import struct
+import zlib
+from collections.abc import Callable
 from datetime import datetime
-import pygame
+import numpy as np
 from enum import Enum, unique
+from typing import TYPE_CHECKING
 
 from colors import (
     OFFICE_COLOR,
@@ -10,9 +14,13 @@ from colors import (
     PARK_COLOR,
     ROAD_COLOR,
     SCHOOL_COLOR,
-    GREY,
 )
 
+if TYPE_CHECKING:
+    import pygame
+
+    from components.renderer import GridRenderer
+
 
 @unique
 class GridState(Enum):
@@ -24,16 +32,58 @@ class GridState(Enum):
     PARK = PARK_COLOR
     EMPTY = None
 
+
+# compact uint8 code of every GridState, used by the array based engines
+GRID_STATES: tuple[GridState, ...] = (
+    GridState.EMPTY,
+    GridState.ROAD,
+    GridState.OFFICE,
+    GridState.HOUSE,
+    GridState.MALL,
+    GridState.SCHOOL,
+    GridState.PARK,
+)
+GRID_CODES: dict[GridState, int] = {state: code for code, state in enumerate(GRID_STATES)}
+
+# binary map files: header, code table, then one uint8 code per cell
+GRID_FILE_MAGIC = b"EPGRID"
+GRID_FILE_VERSION = 1
+GRID_FILE_COMPRESSED = 1
+# magic, version, flags, cols, rows, number of code table entries
+GRID_FILE_HEADER = struct.Struct("<6sHHIIH")
+# the payload starts on a multiple of this so it can be memory-mapped
+GRID_FILE_ALIGN = 64
+
+# called with the edited rectangle (x1, y1, x2, y2), both corners inclusive
+GridListener = Callable[[int, int, int, int], None]
+
+
 class Grid:
     def __init__(self, cols, rows, grid_size, surface):
         self.cols = cols
         self.rows = rows
         self.grid_size = grid_size
-        self.grid: list[list[GridState]] = [
-            [GridState.EMPTY for _ in range(cols)] for _ in range(rows)
-        ]
+        self.init_cells()
         self.surface = surface
         self.current_block: GridState = GridState.ROAD
+        # in-bounds neighbours of each cell, filled lazily as cells are queried
+        self._neighbours: dict[tuple[int, int], tuple[tuple[int, int], ...]] = {}
+        self.listeners: list[GridListener] = []
+        # retained mode renderer, created on the first draw
+        self.renderer: "GridRenderer | None" = None
+
+    def init_cells(self):
+        self.grid: list[list[GridState]] = [
+            [GridState.EMPTY for _ in range(self.cols)] for _ in range(self.rows)
+        ]
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, grid_size: int, surface) -> "Grid":
+        # inverse of to_codes
+        rows, cols = codes.shape
+        grid = cls(cols, rows, grid_size, surface)
+        grid.grid = [[GRID_STATES[code] for code in row] for row in codes.tolist()]
+        return grid
 
     def __getitem__(self, pos: tuple[int, int]) -> GridState:
         r, c = pos
@@ -42,26 +92,58 @@ class Grid:
     def __setitem__(self, pos: tuple[int, int], value: GridState):
         r, c = pos
         self.grid[r][c] = value
+        self.notify_change(c, r, c, r)
+
+    def add_listener(self, listener: GridListener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener: GridListener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def notify_change(self, x1: int, y1: int, x2: int, y2: int):
+        for listener in self.listeners:
+            listener(x1, y1, x2, y2)
 
-    def draw_grid(self):
-        for y in range(self.rows):
-            for x in range(self.cols):
-                rect = pygame.Rect(
-                    x * self.grid_size,
-                    y * self.grid_size,
-                    self.grid_size,
-                    self.grid_size,
-                )
-                pygame.draw.rect(self.surface, GREY, rect, 1)
-
-                block = self.grid[y][x]
-                if block != GridState.EMPTY:
-                    clr = block.value
-                    pygame.draw.rect(self.surface, clr, rect)
+    def to_codes(self) -> np.ndarray:
+        # (rows, cols) array of GRID_CODES
+        codes = np.empty((self.rows, self.cols), dtype=np.uint8)
+        for r, row in enumerate(self.grid):
+            codes[r] = [GRID_CODES[block] for block in row]
+        return codes
+
+    def mask(self, state: GridState) -> np.ndarray:
+        # (rows, cols) bool array of the cells holding `state`
+        return self.to_codes() == GRID_CODES[state]
+
+    def draw_grid(self, area: "pygame.Rect | None" = None):
+        """
+            Blits the cached map image onto the surface, only the cells edited
+            since the last call are redrawn
+            Parameters:
+                - area: pixel rect of the map to draw, the whole map if None
+        """
+        if self.renderer is None:
+            # imported here so headless runs never load pygame
+            from components.renderer import GridRenderer
+
+            self.renderer = GridRenderer(self)
+        self.renderer.draw(self.surface, area)
 
     def check_in_bounds(self, x: int, y: int) -> bool:
         return 0 <= x < self.cols and 0 <= y < self.rows
 
+    def get_neighbours(self, r: int, c: int) -> tuple[tuple[int, int], ...]:
+        neighbours = self._neighbours.get((r, c))
+        if neighbours is None:
+            neighbours = tuple(
+                (r + dy, c + dx)
+                for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]
+                if self.check_in_bounds(c + dx, r + dy)
+            )
+            self._neighbours[r, c] = neighbours
+        return neighbours
+
     def place_blocks(
         self, p1: tuple[int, int], p2: tuple[int, int], block_type: GridState
     ):
@@ -74,19 +156,67 @@ class Grid:
         if not self.check_in_bounds(x1, y1) or not self.check_in_bounds(x2, y2):
             return
 
-        for _x in range(x1, x2 + 1):
-            for _y in range(y1, y2 + 1):
-                self.place_block(_x, _y, block_type)
+        self.fill_rect(x1, y1, x2, y2, block_type)
+        self.notify_change(x1, y1, x2, y2)
 
     def place_block(self, x: int, y: int, block_type: GridState):
         if self.check_in_bounds(x, y):
-            self.grid[y][x] = block_type
+            self.fill_rect(x, y, x, y, block_type)
+            self.notify_change(x, y, x, y)
+
+    def fill_rect(self, x1: int, y1: int, x2: int, y2: int, block_type: GridState):
+        # sets the in-bounds rectangle without notifying listeners
+        for _y in range(y1, y2 + 1):
+            row = self.grid[_y]
+            for _x in range(x1, x2 + 1):
+                row[_x] = block_type
 
     def remove_block(self, x: int, y: int):
         if self.check_in_bounds(x, y):
             self.place_block(x, y, GridState.EMPTY)
 
 
+class ArrayGrid(Grid):
+    """
+        Grid backed by a (rows, cols) uint8 array of GRID_CODES
+        - rectangle edits are slice assignments and masks are one comparison
+        - to_codes hands out a read-only view instead of a copy
+        - `grid` still reads as lists of GridState, built on every access,
+          writes must go through __setitem__ or the place_* methods
+    """
+
+    def init_cells(self):
+        self.codes = np.zeros((self.rows, self.cols), dtype=np.uint8)
+
+    @classmethod
+    def from_codes(cls, codes: np.ndarray, grid_size: int, surface) -> "ArrayGrid":
+        # wraps `codes` without copying it
+        rows, cols = codes.shape
+        grid = cls(cols, rows, grid_size, surface)
+        grid.codes = codes
+        return grid
+
+    @property
+    def grid(self) -> list[list[GridState]]:
+        return [[GRID_STATES[code] for code in row] for row in self.codes.tolist()]
+
+    def __getitem__(self, pos: tuple[int, int]) -> GridState:
+        return GRID_STATES[self.codes.item(pos)]
+
+    def __setitem__(self, pos: tuple[int, int], value: GridState):
+        r, c = pos
+        self.codes[r, c] = GRID_CODES[value]
+        self.notify_change(c, r, c, r)
+
+    def to_codes(self) -> np.ndarray:
+        view = self.codes.view()
+        view.flags.writeable = False
+        return view
+
+    def fill_rect(self, x1: int, y1: int, x2: int, y2: int, block_type: GridState):
+        self.codes[y1 : y2 + 1, x1 : x2 + 1] = GRID_CODES[block_type]
+
+
 def save_grid_as_txt(grid: "Grid", filename: str | None = None):
     if filename is None:
         ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
@@ -100,35 +230,160 @@ def save_grid_as_txt(grid: "Grid", filename: str | None = None):
     with open(filename, "w") as f:
         # write the grid dimlensions in the first line
         f.write(f"{grid.cols}x{grid.rows}\n")
-        for row in grid.grid:
-            for block in row:
-                f.write(f"{block.name} ")
+        names = [state.name for state in GRID_STATES]
+        for row in grid.to_codes().tolist():
+            f.write("".join(f"{names[code]} " for code in row))
             f.write("\n")
 
 
-def load_grid_from_txt(
-    surface: pygame.Surface, grid_size: int, filename: str | None = None
-) -> "Grid | None":
+def resolve_save_path(filename: str | None, extension: str) -> str | None:
+    """
+        A path with a folder is used as is, bare names live in saves/ and
+        None picks the latest save with `extension`
+    """
+    if filename is not None and os.path.dirname(filename):
+        return filename
     # checkc for saves folder
     if not os.path.exists("saves"):
-        return
-    grid = None
+        return None
     # if filename is none check the latest file
     if filename is None:
-        files = os.listdir("saves")
+        files = [f for f in os.listdir("saves") if f.endswith(extension)]
         if not files:
-            return
+            return None
         filename = max(files)
+    return f"saves/{filename}"
+
+
+def load_grid_from_txt(
+    surface: "pygame.Surface | None",
+    grid_size: int,
+    filename: str | None = None,
+    grid_cls: type[Grid] = Grid,
+) -> "Grid | None":
+    path = resolve_save_path(filename, ".txt")
+    if path is None:
+        return
 
     # open the file and read the grid dimensions
-    with open(f"saves/{filename}", "r") as f:
+    with open(path, "r") as f:
         cols, rows = map(int, f.readline().strip().split("x"))
-        grid = Grid(cols, rows, grid_size, surface)
+        codes = np.zeros((rows, cols), dtype=np.uint8)
 
         # read the grid blocks
         for y, line in enumerate(f):
             blocks = line.strip().split(" ")
-            for x, block in enumerate(blocks):
-                grid.grid[y][x] = GridState[block]
+            codes[y, : len(blocks)] = [GRID_CODES[GridState[block]] for block in blocks]
+
+    return grid_cls.from_codes(codes, grid_size, surface)
+
+
+def save_grid_as_bin(grid: "Grid", filename: str | None = None, compress: bool = False):
+    """
+        Saves the grid in the versioned binary map format
+        Parameters:
+            - compress: zlib the cell payload, such files cannot be memory-mapped
+    """
+    if filename is None:
+        ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        filename = f"saves/grid_{ts}.bin"
+
+    # create saves folder if it doesn't exist
+    if not os.path.exists("saves"):
+        os.makedirs("saves")
+
+    with open(filename, "wb") as f:
+        f.write(encode_codes(grid.to_codes(), compress))
+
+
+def encode_codes(codes: np.ndarray, compress: bool = False) -> bytes:
+    # the bytes of a binary map file holding `codes`
+    rows, cols = codes.shape
+    codes = np.ascontiguousarray(codes, dtype=np.uint8)
+    table = b"".join(
+        struct.pack("<BB", code, len(state.name)) + state.name.encode()
+        for code, state in enumerate(GRID_STATES)
+    )
+    header = GRID_FILE_HEADER.pack(
+        GRID_FILE_MAGIC,
+        GRID_FILE_VERSION,
+        GRID_FILE_COMPRESSED if compress else 0,
+        cols,
+        rows,
+        len(GRID_STATES),
+    )
+    header += table
+    header += bytes(-len(header) % GRID_FILE_ALIGN)
+    payload = zlib.compress(codes.tobytes(), 6) if compress else codes.tobytes()
+    return header + payload
+
+
+def load_grid_from_bin(
+    surface: "pygame.Surface | None",
+    grid_size: int,
+    filename: str | None = None,
+    grid_cls: "type[Grid] | None" = None,
+) -> "Grid | None":
+    """
+        Loads a binary map, uncompressed payloads are memory-mapped copy on
+        write so big maps open instantly and edits never reach the file
+        Parameters:
+            - grid_cls: the Grid class to build, ArrayGrid by default
+    """
+    path = resolve_save_path(filename, ".bin")
+    if path is None:
+        return
+    grid_cls = grid_cls or ArrayGrid
+
+    with open(path, "rb") as f:
+        magic, version, flags, cols, rows, table_size = GRID_FILE_HEADER.unpack(
+            f.read(GRID_FILE_HEADER.size)
+        )
+        if magic != GRID_FILE_MAGIC:
+            raise ValueError(f"{path} is not a binary grid file")
+        if version > GRID_FILE_VERSION:
+            raise ValueError(f"{path} has unsupported grid file version {version}")
 
-    return grid
+        # file codes are translated through the names of the states
+        translate = np.zeros(256, dtype=np.uint8)
+        for _ in range(table_size):
+            code, length = struct.unpack("<BB", f.read(2))
+            translate[code] = GRID_CODES[GridState[f.read(length).decode()]]
+        offset = f.tell() + (-f.tell() % GRID_FILE_ALIGN)
+
+        if flags & GRID_FILE_COMPRESSED:
+            f.seek(offset)
+            codes = np.frombuffer(zlib.decompress(f.read()), dtype=np.uint8).copy()
+            codes = codes.reshape(rows, cols)
+        elif rows * cols:
+            codes = np.memmap(path, dtype=np.uint8, mode="c", offset=offset, shape=(rows, cols))
+        else:
+            codes = np.zeros((rows, cols), dtype=np.uint8)
+
+    if not np.array_equal(translate[: len(GRID_STATES)], np.arange(len(GRID_STATES))):
+        codes = translate[codes]
+    return grid_cls.from_codes(codes, grid_size, surface)
+
+
+def load_grid_from_file(
+    surface: "pygame.Surface | None",
+    grid_size: int,
+    filename: str | None = None,
+    grid_cls: "type[Grid] | None" = None,
+) -> "Grid | None":
+    """
+        Loads a text or binary save by its extension, None picks the latest
+        save of either format
+    """
+    if filename is None:
+        latest = [
+            path
+            for path in (resolve_save_path(None, ".txt"), resolve_save_path(None, ".bin"))
+            if path is not None
+        ]
+        if not latest:
+            return
+        filename = max(latest, key=lambda path: os.path.splitext(path)[0])
+    if filename.endswith(".bin"):
+        return load_grid_from_bin(surface, grid_size, filename, grid_cls)
+    return load_grid_from_txt(surface, grid_size, filename, grid_cls or Grid)
@@ -0,0 +1,125 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+from components.grid import GRID_CODES, GridState
+
+PlaceLoc = tuple[int, int]
+
+ROAD_CODE = GRID_CODES[GridState.ROAD]
+EMPTY_CODE = GRID_CODES[GridState.EMPTY]
+NO_BLOCK = -1
+
+# same neighbour order as Grid.get_neighbours, as (dr, dc)
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+
+@dataclass
+class BlockLabels:
+    """
+        Attributes:
+            - labels: (rows, cols) block id of every cell, -1 for roads and empty cells
+            - capacities: number of cells of every block
+            - bboxes: (r_min, c_min, r_max, c_max) of every block, inclusive
+    """
+
+    labels: np.ndarray
+    capacities: np.ndarray
+    bboxes: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.capacities)
+
+
+def label_blocks(codes: np.ndarray) -> BlockLabels:
+    """
+        Connected components of the building cells (anything but roads and
+        empty cells) with 4-neighbourhood, using union-find by min-index
+        hooking and pointer jumping over the whole array at once
+        Block ids are numbered by the first cell of each block in row-major
+        order, the same numbering as a row by row flood fill
+    """
+    rows, cols = codes.shape
+    flat = codes.ravel()
+    building = (flat != EMPTY_CODE) & (flat != ROAD_CODE)
+    cells = np.arange(rows * cols)
+
+    # edges between horizontally and vertically adjacent building cells
+    right = building[:-1] & building[1:] & ((cells[:-1] + 1) % cols != 0)
+    down = building[:-cols] & building[cols:]
+    a = np.concatenate([np.flatnonzero(right), np.flatnonzero(down)])
+    b = np.concatenate([np.flatnonzero(right) + 1, np.flatnonzero(down) + cols])
+
+    parent = cells.copy()
+    while True:
+        root_a, root_b = parent[a], parent[b]
+        differ = root_a != root_b
+        if not differ.any():
+            break
+        # hook every larger root under the smallest root it touches
+        high = np.maximum(root_a, root_b)[differ]
+        low = np.minimum(root_a, root_b)[differ]
+        order = np.lexsort((low, high))
+        high, low = high[order], low[order]
+        first = np.ones(len(high), dtype=bool)
+        first[1:] = high[1:] != high[:-1]
+        parent[high[first]] = low[first]
+        # compress until every cell points straight at its root
+        while True:
+            grand = parent[parent]
+            if np.array_equal(grand, parent):
+                break
+            parent = grand
+
+    labels = np.full(rows * cols, NO_BLOCK, dtype=np.int32)
+    block_cells = np.flatnonzero(building)
+    _, ids = np.unique(parent[block_cells], return_inverse=True)
+    labels[block_cells] = ids
+    num_blocks = int(ids.max(initial=NO_BLOCK)) + 1
+
+    capacities = np.bincount(ids, minlength=num_blocks).astype(np.int32)
+    bboxes = np.empty((num_blocks, 4), dtype=np.int32)
+    if num_blocks:
+        # cells grouped by block, then reduced per group
+        order = np.argsort(ids, kind="stable")
+        starts = np.concatenate([[0], np.cumsum(capacities)[:-1]])
+        block_r, block_c = np.divmod(block_cells[order], cols)
+        bboxes[:, 0] = np.minimum.reduceat(block_r, starts)
+        bboxes[:, 1] = np.minimum.reduceat(block_c, starts)
+        bboxes[:, 2] = np.maximum.reduceat(block_r, starts)
+        bboxes[:, 3] = np.maximum.reduceat(block_c, starts)
+    return BlockLabels(labels.reshape(rows, cols), capacities, bboxes)
+
+
+def closest_road(codes: np.ndarray, loc: PlaceLoc) -> PlaceLoc | None:
+    """
+        First road reached by a depth first walk through the cells of the same
+        type as `loc`, an explicit stack replaces recursion but keeps the visit
+        order so the same road is found
+    """
+    rows, cols = codes.shape
+    r, c = loc
+    state = codes[r, c]
+    if state == ROAD_CODE:
+        return loc
+
+    visited = {loc}
+    # (row, col, index of the next direction to try)
+    stack = [(r, c, 0)]
+    while stack:
+        r, c, k = stack.pop()
+        if k == len(DIRECTIONS):
+            continue
+        stack.append((r, c, k + 1))
+        dr, dc = DIRECTIONS[k]
+        nr, nc = r + dr, c + dc
+        if not (0 <= nr < rows and 0 <= nc < cols) or (nr, nc) in visited:
+            continue
+        code = codes[nr, nc]
+        if code == ROAD_CODE:
+            return nr, nc
+        if code != state:
+            continue
+        visited.add((nr, nc))
+        stack.append((nr, nc, 0))
+    return None
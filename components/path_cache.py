@@ -0,0 +1,86 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+
+PlaceLoc = tuple[int, int]
+Route = tuple[PlaceLoc, ...]
+# (entry road cell, destination block id)
+RouteKey = tuple[PlaceLoc, int]
+
+
+class PathCache:
+    """
+        Bounded LRU cache of routes shared by every person
+        Routes are tuples so one entry can be handed to many people at once
+        Parameters:
+            - max_entries: evict the least recently used route above this count
+            - max_cells: optionally also evict above this many cached cells
+    """
+
+    def __init__(self, max_entries: int = 10_000, max_cells: int | None = None):
+        self.max_entries = max_entries
+        self.max_cells = max_cells
+        self.routes: OrderedDict[RouteKey, Route] = OrderedDict()
+        self.cells = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.routes)
+
+    def get(self, key: RouteKey) -> Route | None:
+        route = self.routes.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.routes.move_to_end(key)
+        return route
+
+    def put(self, key: RouteKey, route: Route):
+        old = self.routes.pop(key, None)
+        if old is not None:
+            self.cells -= len(old)
+        self.routes[key] = route
+        self.cells += len(route)
+        while len(self.routes) > self.max_entries or (
+            self.max_cells is not None and self.cells > self.max_cells
+        ):
+            _, evicted = self.routes.popitem(last=False)
+            self.cells -= len(evicted)
+            self.evictions += 1
+
+    def clear(self):
+        self.routes.clear()
+        self.cells = 0
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.routes),
+            "cells": self.cells,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+@dataclass
+class Trip:
+    """
+        A person's walk along a shared route followed by their own destination
+        cell, `cursor` replaces popping from the front of a private path
+    """
+
+    route: Route
+    dest: PlaceLoc
+    cursor: int = 0
+
+    def next_loc(self) -> PlaceLoc | None:
+        # unreachable destinations have an empty route and finish immediately
+        if not self.route or self.cursor > len(self.route):
+            return None
+        loc = self.route[self.cursor] if self.cursor < len(self.route) else self.dest
+        self.cursor += 1
+        return loc
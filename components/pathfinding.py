@@ -0,0 +1,84 @@
+import heapq
+from itertools import count
+
+from components.grid import Grid, GridState
+from components.profiling import NULL_PROFILER, Profiler
+
+PlaceLoc = tuple[int, int]
+
+
+def manhattan(loc1: PlaceLoc, loc2: PlaceLoc) -> int:
+    return abs(loc1[0] - loc2[0]) + abs(loc1[1] - loc2[1])
+
+
+def a_star(
+    grid: Grid,
+    block_ids: list[list[int]],
+    src: PlaceLoc,
+    dest: PlaceLoc,
+    profiler: Profiler = NULL_PROFILER,
+) -> list[PlaceLoc]:
+    """
+        Finds a path from the road cell `src` to the block containing `dest`
+        Returns:
+            [src, ..., last cell before the block, dest] or [] if unreachable
+
+        The open set is a binary heap ordered by (f, discovery order) so ties
+        are broken exactly like the old `min(open_list)` scan, stale heap
+        entries are skipped lazily and membership checks are O(1)
+        Calls and expanded nodes are counted on `profiler`
+    """
+    profiler.count("astar_calls")
+    r, c = dest
+    dest_type = grid[r, c]
+    dest_id = block_ids[r][c]
+    passable = {GridState.ROAD, dest_type}
+
+    def walkable_neighbours(loc: PlaceLoc) -> list[PlaceLoc]:
+        return [n for n in grid.get_neighbours(*loc) if grid[n] in passable]
+
+    order = count()
+    discovered = {src: next(order)}
+    g = {src: 0}
+    f = {src: manhattan(src, dest)}
+    came_from: dict[PlaceLoc, PlaceLoc] = {}
+    closed: set[PlaceLoc] = set()
+    open_heap = [(f[src], discovered[src], src)]
+
+    while open_heap:
+        current_f, _, current = heapq.heappop(open_heap)
+        # lazy deletion of entries that were expanded or improved since
+        if current in closed or current_f != f[current]:
+            continue
+
+        neighbours = walkable_neighbours(current)
+        # the goal is any cell next to the destination block
+        if any(block_ids[nr][nc] == dest_id for nr, nc in neighbours):
+            path = [dest]
+            while current != src:
+                path.append(current)
+                current = came_from[current]
+            path.append(src)
+            profiler.count("astar_nodes_expanded", len(closed) + 1)
+            return path[::-1]
+
+        closed.add(current)
+
+        tentative_g = g[current] + 1
+        for neighbour in neighbours:
+            if neighbour in closed:
+                continue
+            if neighbour not in discovered:
+                discovered[neighbour] = next(order)
+
+            best_g = g.get(neighbour)
+            if best_g is not None and tentative_g >= best_g:
+                continue
+
+            came_from[neighbour] = current
+            g[neighbour] = tentative_g
+            f[neighbour] = tentative_g + manhattan(neighbour, dest)
+            heapq.heappush(open_heap, (f[neighbour], discovered[neighbour], neighbour))
+
+    profiler.count("astar_nodes_expanded", len(closed))
+    return []
@@ -0,0 +1,224 @@
+from collections.abc import Iterator
+
+import numpy as np
+
+from components.person import (
+    Day,
+    DaySchedule,
+    Person,
+    PersonState,
+    PlaceLoc,
+    TimeTable,
+)
+
+NUM_DAYS = len(Day)
+
+
+class PopulationArrays:
+    """
+        Struct-of-arrays store of every person in the simulation
+        Attributes (one entry per person):
+            - row, col: current location
+            - state: PersonState values
+            - current_idx: index into today's schedule
+            - time: hours spent at the current place
+        Schedules are packed CSR style, the stops of person `p` on day `d` are
+        sched_row/sched_col/sched_time[sched_offsets[p * NUM_DAYS + d] : sched_offsets[p * NUM_DAYS + d + 1]]
+    """
+
+    def __init__(
+        self,
+        sched_offsets: np.ndarray,
+        sched_row: np.ndarray,
+        sched_col: np.ndarray,
+        sched_time: np.ndarray,
+        row: np.ndarray,
+        col: np.ndarray,
+    ):
+        size = len(row)
+        self.sched_offsets = np.asarray(sched_offsets, dtype=np.int64)
+        self.sched_row = np.asarray(sched_row, dtype=np.int32)
+        self.sched_col = np.asarray(sched_col, dtype=np.int32)
+        self.sched_time = np.asarray(sched_time, dtype=np.int32)
+        self.row = np.asarray(row, dtype=np.int32)
+        self.col = np.asarray(col, dtype=np.int32)
+        self.state = np.full(size, PersonState.Staying.value, dtype=np.int8)
+        self.current_idx = np.zeros(size, dtype=np.int32)
+        self.time = np.zeros(size, dtype=np.int32)
+
+    @classmethod
+    def empty(cls) -> "PopulationArrays":
+        return cls(np.zeros(1), [], [], [], [], [])
+
+    @classmethod
+    def from_people(cls, people: list[Person]) -> "PopulationArrays":
+        lengths = [len(p.get_day_schedule(day)) for p in people for day in Day]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        stops = [stop for p in people for day in Day for stop in p.get_day_schedule(day)]
+        sched_row = [r for (r, _), _ in stops]
+        sched_col = [c for (_, c), _ in stops]
+        sched_time = [t for _, t in stops]
+
+        population = cls(
+            offsets,
+            sched_row,
+            sched_col,
+            sched_time,
+            [p.loc[0] for p in people],
+            [p.loc[1] for p in people],
+        )
+        population.state[:] = [p.state.value for p in people]
+        population.current_idx[:] = [p.current_idx for p in people]
+        population.time[:] = [p.time for p in people]
+        return population
+
+    def to_people(self) -> list[Person]:
+        return [
+            Person(view.timetable, view.loc, view.current_idx, view.time, view.state)
+            for view in self
+        ]
+
+    def __len__(self) -> int:
+        return len(self.row)
+
+    def __getitem__(self, i: int) -> "PersonView":
+        if not -len(self) <= i < len(self):
+            raise IndexError(i)
+        return PersonView(self, int(i) % len(self))
+
+    def __iter__(self) -> Iterator["PersonView"]:
+        return (PersonView(self, i) for i in range(len(self)))
+
+    def schedule_bounds(self, i: int, day: Day) -> tuple[int, int]:
+        slot = i * NUM_DAYS + day.value
+        return int(self.sched_offsets[slot]), int(self.sched_offsets[slot + 1])
+
+    def day_schedule(self, i: int, day: Day) -> DaySchedule:
+        start, end = self.schedule_bounds(i, day)
+        return [
+            ((int(r), int(c)), int(t))
+            for r, c, t in zip(
+                self.sched_row[start:end],
+                self.sched_col[start:end],
+                self.sched_time[start:end],
+            )
+        ]
+
+    def update(self, day: Day):
+        """
+            Person.update for everybody at once, gives the same arrays as
+            calling it on every person in order
+        """
+        slot = np.arange(len(self), dtype=np.int64) * NUM_DAYS + day.value
+        start = self.sched_offsets[slot]
+        length = self.sched_offsets[slot + 1] - start
+        np.remainder(self.current_idx, length, out=self.current_idx, where=length > 0)
+
+        staying = self.state == PersonState.Staying.value
+        moving = self.state == PersonState.Moving.value
+        stop = start + self.current_idx
+
+        # staying: count the hour and leave once the stay time is over
+        self.time[staying] += 1
+        INFINITY = -1
+        stay_time = self.sched_time[stop[staying]]
+        departs = np.zeros(len(self), dtype=bool)
+        departs[staying] = (stay_time != INFINITY) & (self.time[staying] >= stay_time)
+        self.state[departs] = PersonState.Moving.value
+        self.time[departs] = 0
+
+        # moving: arrive once standing on the next stop of the schedule
+        moving &= self.current_idx + 1 < length
+        nxt = stop[moving] + 1
+        arrives = np.zeros(len(self), dtype=bool)
+        arrives[moving] = (self.row[moving] == self.sched_row[nxt]) & (
+            self.col[moving] == self.sched_col[nxt]
+        )
+        self.state[arrives] = PersonState.Staying.value
+        self.current_idx[arrives] += 1
+
+    def day_changed(self, new_day: Day):
+        self.time[:] = 0
+        self.current_idx[:] = 0
+
+    def nbytes(self) -> int:
+        return sum(
+            arr.nbytes
+            for arr in (
+                self.sched_offsets,
+                self.sched_row,
+                self.sched_col,
+                self.sched_time,
+                self.row,
+                self.col,
+                self.state,
+                self.current_idx,
+                self.time,
+            )
+        )
+
+
+class PersonView:
+    """
+        Lightweight stand-in for a Person that reads and writes one row of a
+        PopulationArrays, behaviour is shared with Person itself
+    """
+
+    __slots__ = ("population", "index")
+
+    def __init__(self, population: PopulationArrays, index: int):
+        self.population = population
+        self.index = index
+
+    def __repr__(self) -> str:
+        return (
+            f"PersonView(index={self.index}, loc={self.loc}, "
+            f"current_idx={self.current_idx}, time={self.time}, state={self.state})"
+        )
+
+    @property
+    def loc(self) -> PlaceLoc:
+        return int(self.population.row[self.index]), int(self.population.col[self.index])
+
+    @loc.setter
+    def loc(self, loc: PlaceLoc):
+        self.population.row[self.index], self.population.col[self.index] = loc
+
+    @property
+    def state(self) -> PersonState:
+        return PersonState(int(self.population.state[self.index]))
+
+    @state.setter
+    def state(self, state: PersonState):
+        self.population.state[self.index] = state.value
+
+    @property
+    def current_idx(self) -> int:
+        return int(self.population.current_idx[self.index])
+
+    @current_idx.setter
+    def current_idx(self, current_idx: int):
+        self.population.current_idx[self.index] = current_idx
+
+    @property
+    def time(self) -> int:
+        return int(self.population.time[self.index])
+
+    @time.setter
+    def time(self, time: int):
+        self.population.time[self.index] = time
+
+    @property
+    def timetable(self) -> TimeTable:
+        return TimeTable(**{day.name: self.get_day_schedule(day) for day in Day})
+
+    def get_day_schedule(self, day: Day) -> DaySchedule:
+        # a copy, edits do not reach the packed arrays
+        return self.population.day_schedule(self.index, day)
+
+    get_src = Person.get_src
+    get_dest = Person.get_dest
+    update = Person.update
+    day_changed = Person.day_changed
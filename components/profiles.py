@@ -0,0 +1,333 @@
+import json
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from components.grid import GRID_CODES, GRID_STATES, GridState
+from components.person import Day
+from components.population import NUM_DAYS, PopulationArrays
+
+PLACES = [
+    GridState.OFFICE,
+    GridState.MALL,
+    GridState.SCHOOL,
+    GridState.PARK,
+]
+
+HOUSE_CODE = GRID_CODES[GridState.HOUSE]
+PLACE_CODES = tuple(GRID_CODES[state] for state in PLACES)
+# kind of the stops at the person's own house
+HOME = 0
+# stop without its own hours, the stay hours of the chosen place apply
+NO_HOURS = -1
+INFINITY = -1
+
+
+def get_min_max_time_limit(state: GridState) -> tuple[int, int]:
+    if state == GridState.OFFICE:
+        return 4, 8
+    elif state == GridState.MALL:
+        return 4, 10
+    elif state == GridState.SCHOOL:
+        return 8, 12
+    elif state == GridState.PARK:
+        return 2, 6
+    raise Exception("Invalid state")
+
+
+@dataclass
+class Stop:
+    """
+        Attributes:
+            - codes: grid codes of the places to pick from, (HOUSE_CODE,) for home
+            - hours: (min, max) hours of the stay, None for the stay hours of the place
+            - fixed: the same place on every day, like a person's office or school
+    """
+
+    codes: tuple[int, ...]
+    hours: tuple[int, int] | None = None
+    fixed: bool = False
+
+
+@dataclass
+class Profile:
+    """
+        Attributes:
+            - share: relative number of people with this profile
+            - days: the stops of every day, indexed by Day.value, the last stop
+              of a day lasts until midnight
+    """
+
+    name: str
+    share: float
+    days: list[list[Stop]]
+
+
+@dataclass
+class PopulationProfiles:
+    """
+        Population profiles compiled into lookup tables, sampling a population
+        is a few array passes whatever the number of profiles and it leaves
+        the schedules packed in PopulationArrays, so the hourly update costs
+        the same with one profile or many
+        Attributes:
+            - stay_hours: (2, len(GRID_STATES)) min and max stay of every grid code
+            - capacity: people every place cell takes per day, by grid code
+            - population: number of people, random when None
+        Lookup tables, indexed by (profile, day, stop):
+            - length: (profile, day) number of stops
+            - kind: index into `kinds`, HOME for the person's own house
+            - low, high: hours of the stay, NO_HOURS for the stay hours of the place
+            - fixed: the place is drawn once per person and kept every day
+    """
+
+    profiles: list[Profile]
+    stay_hours: np.ndarray
+    capacity: np.ndarray
+    population: int | None = None
+    kinds: list[tuple[int, ...]] = field(init=False)
+
+    def __post_init__(self):
+        if not self.profiles:
+            raise ValueError("At least one population profile is needed")
+        shares = np.array([profile.share for profile in self.profiles], dtype=np.float64)
+        if (shares <= 0).any():
+            raise ValueError("Profile shares must be positive")
+        self.share = shares / shares.sum()
+
+        self.kinds = [(HOUSE_CODE,)]
+        shape = (len(self.profiles), NUM_DAYS)
+        stops = max(len(day) for profile in self.profiles for day in profile.days)
+        self.length = np.zeros(shape, dtype=np.int32)
+        self.kind = np.zeros((*shape, stops), dtype=np.int32)
+        self.low = np.full((*shape, stops), NO_HOURS, dtype=np.int32)
+        self.high = np.full((*shape, stops), NO_HOURS, dtype=np.int32)
+        self.fixed = np.zeros((*shape, stops), dtype=bool)
+        for p, profile in enumerate(self.profiles):
+            for d, day in enumerate(profile.days):
+                self.length[p, d] = len(day)
+                for s, stop in enumerate(day):
+                    if stop.codes not in self.kinds:
+                        self.kinds.append(stop.codes)
+                    self.kind[p, d, s] = self.kinds.index(stop.codes)
+                    if stop.hours is not None:
+                        self.low[p, d, s], self.high[p, d, s] = stop.hours
+                    self.fixed[p, d, s] = stop.fixed
+
+    def sample(
+        self,
+        rng: np.random.Generator,
+        codes: np.ndarray,
+        in_block: np.ndarray,
+        cols: int,
+        population: int,
+    ) -> tuple[PopulationArrays, int]:
+        """
+            Draws `population` people, each with their own house, returns the
+            people and the number of visits that went over the capacity of
+            their place
+            Parameters:
+                - codes, in_block: flat grid codes and whether each cell is in a block
+        """
+        houses = np.flatnonzero(in_block & (codes == HOUSE_CODE))
+        home = houses[rng.permutation(len(houses))[:population]]
+        profile = rng.choice(len(self.profiles), population, p=self.share)
+
+        # one entry per stop of every (person, day), in the packed CSR order
+        lengths = self.length[profile].ravel()
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        slot = np.repeat(np.arange(len(lengths)), lengths)
+        person = slot // NUM_DAYS
+        # flat index into the (profile, day, stop) tables
+        entry = np.repeat(profile * NUM_DAYS, NUM_DAYS) + np.tile(np.arange(NUM_DAYS), population)
+        entry = entry[slot] * self.kind.shape[2] + np.arange(len(slot)) - offsets[slot]
+        kind = self.kind.ravel()[entry]
+
+        cell = np.empty(len(slot), dtype=np.int64)
+        at_home = np.flatnonzero(kind == HOME)
+        cell[at_home] = home[person[at_home]]
+
+        # stops at places, grouped by whether the place is fixed, day and kind
+        away = np.flatnonzero(kind != HOME)
+        away_kind = kind[away]
+        away_day = slot[away] % NUM_DAYS
+        fixed = self.fixed.ravel()[entry[away]]
+
+        pool = PlacePool(
+            rng,
+            {
+                code: np.repeat(np.flatnonzero(in_block & (codes == code)), self.capacity[code])
+                for code in PLACE_CODES
+            },
+        )
+        # fixed places are drawn once and held on every day
+        for k in range(1, len(self.kinds)):
+            stops = away[fixed & (away_kind == k)]
+            if len(stops):
+                owners, owner = np.unique(person[stops], return_inverse=True)
+                cell[stops] = pool.take(self.kinds[k], len(owners))[owner]
+        overflow = pool.overflow
+        remaining = pool.remaining()
+        for d in range(NUM_DAYS):
+            pool = PlacePool(rng, remaining)
+            today = ~fixed & (away_day == d)
+            for k in range(1, len(self.kinds)):
+                stops = away[today & (away_kind == k)]
+                cell[stops] = pool.take(self.kinds[k], len(stops))
+            overflow += pool.overflow
+
+        low, high = self.low.ravel()[entry], self.high.ravel()[entry]
+        by_place = np.flatnonzero(low == NO_HOURS)
+        place_codes = codes[cell[by_place]]
+        low[by_place] = self.stay_hours[0, place_codes]
+        high[by_place] = self.stay_hours[1, place_codes]
+        time = rng.integers(low, high, endpoint=True).astype(np.int32)
+        # the last stop of a day lasts until midnight
+        time[offsets[1:][lengths > 0] - 1] = INFINITY
+
+        sched_row, sched_col = np.divmod(cell, cols)
+        home_row, home_col = np.divmod(home, cols)
+        people = PopulationArrays(offsets, sched_row, sched_col, time, home_row, home_col)
+        return people, overflow
+
+
+class PlacePool:
+    """
+        One day of capacity of every place, a place cell with capacity n
+        appears n times in the slots of its grid code and every slot is handed
+        out once, in a random order
+        When a kind of place is full the extra visitors still go, spread over
+        its places by capacity, and are counted in `overflow`
+    """
+
+    def __init__(self, rng: np.random.Generator, slots: dict[int, np.ndarray]):
+        self.rng = rng
+        self.slots = {code: rng.permutation(cells) for code, cells in slots.items()}
+        self.used = dict.fromkeys(slots, 0)
+        self.overflow = 0
+
+    def take(self, codes: tuple[int, ...], count: int) -> np.ndarray:
+        if not count:
+            return np.empty(0, dtype=np.int64)
+        total = sum(len(self.slots[code]) for code in codes)
+        if not total:
+            names = ", ".join(GRID_STATES[code].name for code in codes)
+            raise ValueError(f"No {names} with any capacity on the map for {count} visits")
+
+        left = np.array([len(self.slots[code]) - self.used[code] for code in codes], dtype=np.int64)
+        if left.sum() >= count:
+            split = self.rng.multivariate_hypergeometric(left, count)
+        else:
+            split = left
+        picked = []
+        for code, n in zip(codes, split.tolist()):
+            picked.append(self.slots[code][self.used[code] : self.used[code] + n])
+            self.used[code] += n
+        over = count - int(split.sum())
+        if over:
+            every = np.concatenate([self.slots[code] for code in codes])
+            picked.append(every[self.rng.integers(0, len(every), over)])
+            self.overflow += over
+        return self.rng.permutation(np.concatenate(picked))
+
+    def remaining(self) -> dict[int, np.ndarray]:
+        return {code: slots[self.used[code] :] for code, slots in self.slots.items()}
+
+
+def default_stay_hours() -> np.ndarray:
+    # get_min_max_time_limit of every place and 4 to 8 hours at home
+    stay_hours = np.zeros((2, len(GRID_STATES)), dtype=np.int32)
+    stay_hours[:, HOUSE_CODE] = 4, 8
+    for state in PLACES:
+        stay_hours[:, GRID_CODES[state]] = get_min_max_time_limit(state)
+    return stay_hours
+
+
+def default_profiles() -> PopulationProfiles:
+    """
+        Everybody goes from home to any place and back every day, every place
+        takes one person a day
+    """
+    day = [Stop((HOUSE_CODE,)), Stop(PLACE_CODES), Stop((HOUSE_CODE,))]
+    return PopulationProfiles(
+        [Profile("resident", 1.0, [day] * NUM_DAYS)],
+        default_stay_hours(),
+        np.ones(len(GRID_STATES), dtype=np.int64),
+    )
+
+
+def load_profiles(filename: str) -> PopulationProfiles:
+    with open(filename) as f:
+        return parse_profiles(json.load(f))
+
+
+def parse_profiles(config: dict) -> PopulationProfiles:
+    """
+        Compiles a profile config, see profiles.json for an example
+        Keys:
+            - profiles: name -> {share, weekday, weekend, <day name>}, each day an
+              itinerary, weekend defaults to weekday and a day name overrides both
+            - weekend: names of the weekend days, defaults to ["Saturday"]
+            - stay_hours: grid state name -> [min, max], overrides get_min_max_time_limit
+            - capacity: grid state name -> people per cell per day, defaults to 1
+            - population: number of people
+        An itinerary is a list of stops starting at HOUSE, the person's own
+        house, a stop is {"place": name, list of names or "ANY", "hours": [min, max],
+        "fixed": bool}, the last stop of the day lasts until midnight
+    """
+    stay_hours = default_stay_hours()
+    for name, hours in config.get("stay_hours", {}).items():
+        stay_hours[:, _code(name)] = _parse_hours(hours)
+    capacity = np.ones(len(GRID_STATES), dtype=np.int64)
+    for name, people in config.get("capacity", {}).items():
+        if people < 0:
+            raise ValueError(f"Negative capacity for {name}")
+        capacity[_code(name)] = people
+    weekend = {Day[name] for name in config.get("weekend", [Day.Saturday.name])}
+
+    profiles = []
+    for name, spec in config["profiles"].items():
+        weekday = _parse_itinerary(spec["weekday"], name)
+        weekend_day = _parse_itinerary(spec["weekend"], name) if "weekend" in spec else weekday
+        days = [
+            _parse_itinerary(spec[day.name], name)
+            if day.name in spec
+            else weekend_day if day in weekend else weekday
+            for day in Day
+        ]
+        profiles.append(Profile(name, float(spec.get("share", 1)), days))
+    return PopulationProfiles(profiles, stay_hours, capacity, config.get("population"))
+
+
+def _code(name: str) -> int:
+    try:
+        return GRID_CODES[GridState[name]]
+    except KeyError:
+        raise ValueError(f"Unknown place {name}") from None
+
+
+def _parse_hours(hours: list[int]) -> tuple[int, int]:
+    low, high = hours
+    if not 0 <= low <= high:
+        raise ValueError(f"Invalid stay hours {hours}")
+    return low, high
+
+
+def _parse_itinerary(stops: list[dict], profile: str) -> list[Stop]:
+    itinerary = []
+    for spec in stops:
+        place = spec["place"]
+        if place == "ANY":
+            codes = PLACE_CODES
+        else:
+            codes = tuple(sorted({_code(name) for name in ([place] if isinstance(place, str) else place)}))
+        if HOUSE_CODE in codes and len(codes) > 1:
+            raise ValueError(f"HOUSE can not be mixed with other places in profile {profile}")
+        if not set(codes) <= {HOUSE_CODE, *PLACE_CODES}:
+            raise ValueError(f"People can not stay on {place} in profile {profile}")
+        hours = _parse_hours(spec["hours"]) if "hours" in spec else None
+        itinerary.append(Stop(codes, hours, bool(spec.get("fixed", False))))
+    if not itinerary or itinerary[0].codes != (HOUSE_CODE,):
+        raise ValueError(f"Every itinerary of profile {profile} must start at HOUSE")
+    return itinerary
@@ -0,0 +1,164 @@
+import csv
+import json
+import time
+
+# histogram buckets are powers of two microseconds, the last one is open
+NUM_BUCKETS = 40
+
+
+class Histogram:
+    """
+        Latency histogram with power of two microsecond buckets, constant
+        memory however many samples are added
+    """
+
+    __slots__ = ("count", "total", "min", "max", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+        self.buckets = [0] * NUM_BUCKETS
+
+    def add(self, seconds: float):
+        self.count += 1
+        self.total += seconds
+        self.min = min(self.min, seconds)
+        self.max = max(self.max, seconds)
+        self.buckets[min(int(seconds * 1e6).bit_length(), NUM_BUCKETS - 1)] += 1
+
+    def quantile(self, q: float) -> float:
+        # upper edge in seconds of the bucket holding the q-th sample
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bucket, samples in enumerate(self.buckets):
+            seen += samples
+            if seen >= rank:
+                return min((1 << bucket) / 1e6, self.max)
+        return self.max
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "min_ms": self.min * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+
+class Timing:
+    # context manager recording the time spent in its block
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Profiler:
+    """
+        Counters and latency histograms of the named phases of a run
+        Methods:
+        - count : adds to a counter
+        - time : context manager timing a phase
+        - record : adds a latency sample in seconds
+        - stats : every counter and histogram summary
+        - to_json, to_csv : exports stats
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.counters: dict[str, int] = {}
+        self.timings: dict[str, Histogram] = {}
+
+    def count(self, name: str, n: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def record(self, name: str, seconds: float):
+        histogram = self.timings.get(name)
+        if histogram is None:
+            histogram = self.timings[name] = Histogram()
+        histogram.add(seconds)
+
+    def time(self, name: str) -> Timing:
+        return Timing(self, name)
+
+    def reset(self):
+        self.counters.clear()
+        self.timings.clear()
+
+    def stats(self) -> dict[str, dict]:
+        return {
+            "counters": dict(self.counters),
+            "timings": {name: h.summary() for name, h in self.timings.items()},
+        }
+
+    def to_json(self, filename: str):
+        with open(filename, "w") as f:
+            json.dump(self.stats(), f, indent=2)
+
+    def to_csv(self, filename: str):
+        # one row per counter and per timed phase
+        fields = ["kind", "name", "value", "count", "total_ms", "mean_ms", "min_ms", "max_ms", "p50_ms", "p95_ms", "p99_ms"]
+        with open(filename, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields)
+            writer.writeheader()
+            for name, value in self.counters.items():
+                writer.writerow({"kind": "counter", "name": name, "value": value})
+            for name, histogram in self.timings.items():
+                writer.writerow({"kind": "timing", "name": name, **histogram.summary()})
+
+    def export(self, filename: str):
+        # format picked by the extension, json unless it ends with .csv
+        if filename.endswith(".csv"):
+            self.to_csv(filename)
+        else:
+            self.to_json(filename)
+
+
+class NullTiming:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullProfiler(Profiler):
+    """
+        Profiler that records nothing, the default of every Simulation so
+        instrumented code costs a method call when profiling is off
+    """
+
+    enabled = False
+    _timing = NullTiming()
+
+    def count(self, name: str, n: int = 1):
+        pass
+
+    def record(self, name: str, seconds: float):
+        pass
+
+    def time(self, name: str) -> NullTiming:  # type: ignore[override]
+        return self._timing
+
+
+NULL_PROFILER = NullProfiler()
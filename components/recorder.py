@@ -0,0 +1,216 @@
+import os
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from components.grid import GRID_STATES
+from components.person import PersonState
+
+if TYPE_CHECKING:
+    from components.simulation import Simulation
+
+FORMATS = ("parquet", "arrow", "npy")
+
+
+def has_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class MetricsRecorder:
+    """
+        Samples aggregate counts of a Simulation every simulated hour and
+        streams them to columnar files in chunks
+        Every sample holds the people per PersonState, per building type
+        they stand on, per HealthState when a disease runs, the people of
+        every block and optionally every position
+        Samples are buffered for `chunk_hours` hours, then the chunk is handed
+        to a background writer through a queue of at most `max_pending`
+        chunks, so memory stays bounded however long the run and the tick
+        loop never waits on the disk unless the writer falls that far behind
+        Files, numbered by chunk:
+        - parquet / arrow: metrics_00000.parquet or .arrow, one row per hour,
+          block counts and positions as list columns (needs pyarrow)
+        - npy: metrics_00000.npy structured array of the scalar columns,
+          blocks_00000.npy (hours, blocks) and positions_00000.npy (hours, 2, people)
+        Methods:
+        - sample : records one hour, registered as an hour listener
+        - flush : hands the buffered hours to the writer
+        - close : writes everything left and stops the writer
+    """
+
+    def __init__(
+        self,
+        simulation: "Simulation",
+        folder: str,
+        positions: bool = False,
+        chunk_hours: int = 24 * 7,
+        file_format: str = "auto",
+        max_pending: int = 4,
+    ):
+        """
+            Parameters:
+                - positions: also record the row and col of every person
+                - file_format: parquet, arrow, npy, or auto for parquet when pyarrow is installed
+        """
+        if file_format == "auto":
+            file_format = "parquet" if has_pyarrow() else "npy"
+        if file_format not in FORMATS:
+            raise ValueError(f"Unknown metrics format {file_format}")
+        if file_format != "npy" and not has_pyarrow():
+            raise ImportError(f"Writing {file_format} files needs pyarrow")
+
+        self.simulation = simulation
+        self.folder = folder
+        self.positions = positions
+        self.chunk_hours = chunk_hours
+        self.file_format = file_format
+        os.makedirs(folder, exist_ok=True)
+
+        self.hours = 0
+        self.chunks = 0
+        self.rows: list[dict[str, int]] = []
+        self.block_counts: list[np.ndarray] = []
+        self.locations: list[np.ndarray] = []
+
+        # metrics of the writer
+        self.bytes_written = 0
+        self.write_time = 0.0
+        self.waits = 0
+        # first failure of the writer, raised again by close
+        self.error: Exception | None = None
+
+        self.pending: queue.Queue = queue.Queue(maxsize=max_pending)
+        self.writer = threading.Thread(target=self.run, name="metrics-writer", daemon=True)
+        self.writer.start()
+        simulation.hour_listeners.append(self.sample)
+
+    def sample(self):
+        sim = self.simulation
+        people = sim.people
+        index = sim.spatial_index
+        block_count = index.block_count.copy()
+        # a chunk keeps one shape, flush when the blocks or the people changed
+        if self.block_counts and len(block_count) != len(self.block_counts[0]):
+            self.flush()
+        elif self.locations and len(people) != self.locations[0].shape[1]:
+            self.flush()
+
+        row = {"hour": self.hours, "day": sim.day.value, "hrs": sim.hrs}
+        states = np.bincount(people.state, minlength=len(PersonState))
+        for state in PersonState:
+            row[f"state_{state.name}"] = int(states[state.value])
+        buildings = np.bincount(
+            sim.codes.ravel()[index.person_cell], minlength=len(GRID_STATES)
+        )
+        for code, state in enumerate(GRID_STATES):
+            row[f"building_{state.name}"] = int(buildings[code])
+        if sim.disease is not None:
+            for state, count in sim.disease.counts().items():
+                row[f"health_{state.name}"] = count
+
+        self.rows.append(row)
+        self.block_counts.append(block_count)
+        if self.positions:
+            self.locations.append(np.stack([people.row, people.col]))
+        self.hours += 1
+        if len(self.rows) >= self.chunk_hours:
+            self.flush()
+
+    def flush(self):
+        if not self.rows:
+            return
+        chunk = (self.chunks, self.rows, self.block_counts, self.locations)
+        self.rows, self.block_counts, self.locations = [], [], []
+        self.chunks += 1
+        if self.pending.full():
+            self.waits += 1
+        self.pending.put(chunk)
+
+    def run(self):
+        while True:
+            chunk = self.pending.get()
+            if chunk is None:
+                return
+            start = time.perf_counter()
+            try:
+                for path in self.write(*chunk):
+                    self.bytes_written += os.path.getsize(path)
+            except Exception as e:
+                # keep draining the queue so sample never blocks forever
+                self.error = self.error or e
+            self.write_time += time.perf_counter() - start
+
+    def write(
+        self,
+        number: int,
+        rows: list[dict[str, int]],
+        block_counts: list[np.ndarray],
+        locations: list[np.ndarray],
+    ) -> list[str]:
+        # writes one chunk, returns the files written
+        columns = {name: np.array([row.get(name, 0) for row in rows], dtype=np.int64) for name in rows[0]}
+        blocks = np.stack(block_counts)
+        name = os.path.join(self.folder, f"metrics_{number:05d}")
+
+        if self.file_format == "npy":
+            paths = [f"{name}.npy", os.path.join(self.folder, f"blocks_{number:05d}.npy")]
+            table = np.zeros(len(rows), dtype=[(column, np.int64) for column in columns])
+            for column, values in columns.items():
+                table[column] = values
+            np.save(paths[0], table)
+            np.save(paths[1], blocks)
+            if locations:
+                paths.append(os.path.join(self.folder, f"positions_{number:05d}.npy"))
+                np.save(paths[2], np.stack(locations))
+            return paths
+
+        import pyarrow as pa
+
+        def list_column(matrix: np.ndarray) -> pa.Array:
+            # one fixed size list per hour
+            return pa.FixedSizeListArray.from_arrays(pa.array(matrix.ravel()), matrix.shape[1])
+
+        data = {column: pa.array(values) for column, values in columns.items()}
+        data["block_count"] = list_column(blocks)
+        if locations:
+            stacked = np.stack(locations)
+            data["row"] = list_column(stacked[:, 0])
+            data["col"] = list_column(stacked[:, 1])
+        table = pa.table(data)
+
+        if self.file_format == "parquet":
+            import pyarrow.parquet as pq
+
+            path = f"{name}.parquet"
+            pq.write_table(table, path)
+        else:
+            import pyarrow.feather as feather
+
+            path = f"{name}.arrow"
+            feather.write_feather(table, path)
+        return [path]
+
+    def close(self):
+        self.flush()
+        self.pending.put(None)
+        self.writer.join()
+        if self.sample in self.simulation.hour_listeners:
+            self.simulation.hour_listeners.remove(self.sample)
+        if self.error is not None:
+            raise self.error
+
+    def stats(self) -> dict[str, int | float]:
+        return {
+            "hours": self.hours,
+            "chunks": self.chunks,
+            "bytes_written": self.bytes_written,
+            "write_ms": self.write_time * 1000,
+            "waits": self.waits,
+        }
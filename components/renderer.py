@@ -0,0 +1,230 @@
+from itertools import groupby
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pygame
+
+from colors import GREY, WHITE
+from components.person import PersonState
+
+if TYPE_CHECKING:
+    from components.grid import Grid, GridState
+    from components.profiling import Profiler
+    from components.simulation import Simulation
+
+
+class GridRenderer:
+    """
+        Retained mode drawing of a Grid
+        - the grid lines are drawn once into a cached overlay
+        - the base layer holds the overlay with every block filled in, it is
+          built once and only the cells edited since the last frame are
+          redrawn, so an idle map costs a single blit per frame
+        Methods:
+        - update : redraws the dirty cells of the base layer
+        - draw : blits the base layer onto a surface
+    """
+
+    def __init__(self, grid: "Grid"):
+        self.grid = grid
+        self.size = grid.grid_size
+        width, height = grid.cols * self.size, grid.rows * self.size
+
+        self.lines = pygame.Surface((width, height))
+        self.lines.fill(WHITE)
+        # the 1px outline of every cell, as two lines per column and row
+        for x in range(grid.cols):
+            for px in (x * self.size, (x + 1) * self.size - 1):
+                pygame.draw.line(self.lines, GREY, (px, 0), (px, height - 1))
+        for y in range(grid.rows):
+            for py in (y * self.size, (y + 1) * self.size - 1):
+                pygame.draw.line(self.lines, GREY, (0, py), (width - 1, py))
+
+        self.base = self.lines.copy()
+        # edited cell rectangles (x1, y1, x2, y2) waiting to be redrawn
+        self.dirty: list[tuple[int, int, int, int]] = [(0, 0, grid.cols - 1, grid.rows - 1)]
+        grid.add_listener(self.on_grid_change)
+
+    def on_grid_change(self, x1: int, y1: int, x2: int, y2: int):
+        self.dirty.append((x1, y1, x2, y2))
+
+    def update(self) -> list[pygame.Rect]:
+        # returns the pixel rects of the base layer that were redrawn
+        redrawn = []
+        dirty, self.dirty = self.dirty, []
+        for x1, y1, x2, y2 in dirty:
+            rect = self.pixel_rect(x1, y1, x2, y2)
+            # restore the empty look, then fill every run of equal blocks in one go
+            self.base.blit(self.lines, rect, rect)
+            for y in range(y1, y2 + 1):
+                x = x1
+                for block, run in groupby(self.grid[y, _x] for _x in range(x1, x2 + 1)):
+                    length = len(list(run))
+                    self.fill_run(x, y, length, block)
+                    x += length
+            redrawn.append(rect)
+        return redrawn
+
+    def fill_run(self, x: int, y: int, length: int, block: "GridState"):
+        if block.value is None:
+            return
+        rect = pygame.Rect(x * self.size, y * self.size, length * self.size, self.size)
+        self.base.fill(block.value, rect)
+
+    def pixel_rect(self, x1: int, y1: int, x2: int, y2: int) -> pygame.Rect:
+        return pygame.Rect(
+            x1 * self.size,
+            y1 * self.size,
+            (x2 - x1 + 1) * self.size,
+            (y2 - y1 + 1) * self.size,
+        )
+
+    def draw(self, surface: pygame.Surface, area: pygame.Rect | None = None):
+        """
+            Parameters:
+                - area: only blit this pixel rect of the map, the whole map if None
+        """
+        self.update()
+        if area is None:
+            surface.blit(self.base, (0, 0))
+        else:
+            surface.blit(self.base, area.topleft, area)
+
+    def close(self):
+        self.grid.remove_listener(self.on_grid_change)
+
+
+# colour of the agents in every PersonState, by value
+AGENT_COLORS = {
+    PersonState.Staying.value: (170, 0, 0),
+    PersonState.Moving.value: (255, 0, 0),
+}
+AGENT_RADIUS = 10
+HEATMAP_COLOR = (255, 0, 0)
+
+
+class AgentRenderer:
+    """
+        Draws the people of a Simulation in screen space
+        - one pre-rendered sprite per PersonState and zoom level, all visible
+          agents are blitted in a single Surface.blits batch
+        - agents outside the surface clip rect are culled with numpy
+        - above `density_threshold` agents per visible cell the agents are
+          drawn as a per-cell heatmap instead
+    """
+
+    def __init__(self, simulation: "Simulation", density_threshold: float = 2.0):
+        """
+            Parameters:
+                - density_threshold: visible agents per visible cell that switches to the heatmap
+        """
+        self.simulation = simulation
+        self.density_threshold = density_threshold
+        self.sprites: dict[tuple[int, float], pygame.Surface] = {}
+
+    def sprite(self, state: int, zoom: float) -> pygame.Surface:
+        sprite = self.sprites.get((state, zoom))
+        if sprite is None:
+            radius = AGENT_RADIUS * zoom
+            side = int(radius * 2) + 2
+            sprite = pygame.Surface((side, side), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, AGENT_COLORS[state], (side / 2, side / 2), radius)
+            self.sprites[state, zoom] = sprite
+        return sprite
+
+    def draw(self, surface: pygame.Surface, zoom: float = 1.0, offset: tuple[int, int] = (0, 0)):
+        """
+            Parameters:
+                - zoom, offset: map pixel to screen transform, screen = map * zoom + offset
+        """
+        people = self.simulation.people
+        if not len(people):
+            return
+        size = self.simulation.grid.grid_size
+        cell = size * zoom
+        offset_x, offset_y = offset
+        clip = surface.get_clip()
+
+        # visible cell range, agents are kept if their cell overlaps the clip
+        c0 = max(int((clip.left - offset_x) // cell), 0)
+        r0 = max(int((clip.top - offset_y) // cell), 0)
+        c1 = min(int((clip.right - offset_x) // cell) + 1, self.simulation.cols)
+        r1 = min(int((clip.bottom - offset_y) // cell) + 1, self.simulation.rows)
+        if c1 <= c0 or r1 <= r0:
+            return
+        rows, cols = people.row, people.col
+        visible = np.flatnonzero((rows >= r0) & (rows < r1) & (cols >= c0) & (cols < c1))
+        if not len(visible):
+            return
+
+        if len(visible) > self.density_threshold * (r1 - r0) * (c1 - c0):
+            self.draw_heatmap(surface, visible, (r0, c0, r1, c1), cell, offset)
+            return
+
+        centers_x = (cols[visible] * size + size // 2) * zoom + offset_x
+        centers_y = (rows[visible] * size + size // 2) * zoom + offset_y
+        states = people.state[visible]
+        batch = []
+        for state in AGENT_COLORS:
+            picked = states == state
+            if not picked.any():
+                continue
+            sprite = self.sprite(state, zoom)
+            half = sprite.get_width() / 2
+            xs = (centers_x[picked] - half).round().astype(int).tolist()
+            ys = (centers_y[picked] - half).round().astype(int).tolist()
+            batch.extend(zip([sprite] * len(xs), zip(xs, ys)))
+        surface.blits(batch, doreturn=False)
+
+    def draw_heatmap(
+        self,
+        surface: pygame.Surface,
+        visible: np.ndarray,
+        cells: tuple[int, int, int, int],
+        cell: float,
+        offset: tuple[int, int],
+    ):
+        # agents per cell of the visible range as the alpha of one colour
+        r0, c0, r1, c1 = cells
+        people = self.simulation.people
+        width, height = c1 - c0, r1 - r0
+        flat = (people.row[visible] - r0) * width + (people.col[visible] - c0)
+        counts = np.bincount(flat, minlength=width * height).reshape(height, width)
+        alpha = np.where(counts > 0, 55 + 200 * counts / counts.max(), 0).astype(np.uint8)
+
+        heatmap = pygame.Surface((width, height), pygame.SRCALPHA)
+        heatmap.fill(HEATMAP_COLOR)
+        pixels = pygame.surfarray.pixels_alpha(heatmap)
+        pixels[:] = alpha.T
+        del pixels
+        heatmap = pygame.transform.scale(
+            heatmap, (round(width * cell), round(height * cell))
+        )
+        offset_x, offset_y = offset
+        surface.blit(heatmap, (round(c0 * cell) + offset_x, round(r0 * cell) + offset_y))
+
+
+def draw_profiler_overlay(surface: pygame.Surface, profiler: "Profiler", topleft: tuple[int, int]):
+    # a few lines of the live profiler numbers, drawn onto the hud
+    timings = profiler.timings
+    counters = profiler.counters
+
+    def p50_p95(name: str) -> str:
+        histogram = timings.get(name)
+        if histogram is None:
+            return "-"
+        return f"{histogram.quantile(0.5) * 1000:.1f}/{histogram.quantile(0.95) * 1000:.1f} ms"
+
+    hits, misses = counters.get("route_cache_hits", 0), counters.get("route_cache_misses", 0)
+    hit_rate = hits / (hits + misses) if hits + misses else 0.0
+    lines = [
+        f"frame {p50_p95('frame')}, draw {p50_p95('draw')}",
+        f"step {p50_p95('update_min')}, moved {counters.get('agents_moved', 0)}",
+        f"A* {counters.get('astar_calls', 0)} ({counters.get('astar_nodes_expanded', 0)} nodes), "
+        f"cache {hit_rate:.0%}",
+    ]
+    font = pygame.font.Font(None, 20)
+    x, y = topleft
+    for line in lines:
+        surface.blit(font.render(line, True, (0, 0, 0)), (x, y))
+        y += font.get_linesize()
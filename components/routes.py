@@ -0,0 +1,172 @@
+import numpy as np
+
+from components.grid import GRID_CODES, Grid, GridState
+
+PlaceLoc = tuple[int, int]
+
+# next_hop values that are not node indices
+GOAL = -1
+UNREACHED = -2
+
+ROAD_CODE = GRID_CODES[GridState.ROAD]
+EMPTY_CODE = GRID_CODES[GridState.EMPTY]
+
+# same neighbour order as Grid.get_neighbours, as (dr, dc)
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0)]
+
+
+class RoadGraph:
+    """
+        Compact graph over every non empty cell of the grid
+        Attributes:
+            - cell_to_node: flat cell index -> node index or -1
+            - node_to_cell: node index -> flat cell index
+            - codes: GRID_CODES of every node
+            - indptr, indices: CSR adjacency of the nodes
+    """
+
+    def __init__(self, codes: np.ndarray):
+        rows, cols = codes.shape
+        flat = codes.ravel()
+        self.cols = cols
+        self.node_to_cell = np.flatnonzero(flat != EMPTY_CODE).astype(np.int32)
+        self.cell_to_node = np.full(rows * cols, -1, dtype=np.int32)
+        self.cell_to_node[self.node_to_cell] = np.arange(
+            len(self.node_to_cell), dtype=np.int32
+        )
+        self.codes = flat[self.node_to_cell]
+
+        node_r, node_c = np.divmod(self.node_to_cell, cols)
+        neighbours = np.full((len(self.node_to_cell), len(DIRECTIONS)), -1, np.int32)
+        for i, (dr, dc) in enumerate(DIRECTIONS):
+            nr, nc = node_r + dr, node_c + dc
+            inside = (nr >= 0) & (nr < rows) & (nc >= 0) & (nc < cols)
+            neighbours[inside, i] = self.cell_to_node[nr[inside] * cols + nc[inside]]
+
+        valid = neighbours >= 0
+        self.indptr = np.zeros(len(self.node_to_cell) + 1, dtype=np.int64)
+        np.cumsum(valid.sum(axis=1), out=self.indptr[1:])
+        self.indices = neighbours[valid]
+
+    def __len__(self) -> int:
+        return len(self.node_to_cell)
+
+    def expand(self, nodes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # (source node, neighbour node) for every edge leaving `nodes`
+        starts, ends = self.indptr[nodes], self.indptr[nodes + 1]
+        lengths = ends - starts
+        sources = np.repeat(nodes, lengths)
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return sources, self.indices[np.repeat(starts, lengths) + offsets]
+
+
+class RouteTable:
+    """
+        Precomputed shortest routes from every road cell to destination blocks
+        - one BFS per (block id, destination type) fills a next-hop array over
+          the nodes of a RoadGraph, roads and the destination type are walkable
+        - get_path walks that array, so a lookup costs O(path length)
+        - edits made through the grid are collected and applied lazily, only the
+          tables whose reached area touches an edit are recomputed
+    """
+
+    def __init__(self, grid: Grid, block_ids: list[list[int]]):
+        self.grid = grid
+        self.block_ids = np.asarray(block_ids, dtype=np.int32).ravel()
+        self.codes = grid.to_codes()
+        self.graph = RoadGraph(self.codes)
+        self.tables: dict[tuple[int, int], np.ndarray] = {}
+        self.dirty: list[tuple[int, int, int, int]] = []
+        grid.add_listener(self.on_grid_change)
+
+    def close(self):
+        self.grid.remove_listener(self.on_grid_change)
+
+    def on_grid_change(self, x1: int, y1: int, x2: int, y2: int):
+        self.dirty.append((x1, y1, x2, y2))
+
+    def key(self, dest: PlaceLoc) -> tuple[int, int]:
+        r, c = dest
+        return int(self.block_ids[r * self.graph.cols + c]), GRID_CODES[self.grid[r, c]]
+
+    def precompute(self, destinations):
+        self.apply_edits()
+        for dest in destinations:
+            key = self.key(dest)
+            if key not in self.tables:
+                self.tables[key] = self.bfs(*key)
+
+    def get_path(self, src: PlaceLoc, dest: PlaceLoc) -> list[PlaceLoc]:
+        """
+            Same contract as pathfinding.a_star:
+            [src, ..., last cell before the block, dest] or [] if unreachable
+        """
+        self.apply_edits()
+        key = self.key(dest)
+        table = self.tables.get(key)
+        if table is None:
+            table = self.tables[key] = self.bfs(*key)
+
+        graph = self.graph
+        node = graph.cell_to_node[src[0] * graph.cols + src[1]]
+        if node < 0 or table[node] == UNREACHED:
+            return []
+
+        path = [src]
+        node = table[node]
+        while node != GOAL:
+            path.append(divmod(int(graph.node_to_cell[node]), graph.cols))
+            node = table[node]
+        path.append(dest)
+        return path
+
+    def bfs(self, block_id: int, dest_code: int) -> np.ndarray:
+        graph = self.graph
+        next_hop = np.full(len(graph), UNREACHED, dtype=np.int32)
+        walkable = (graph.codes == ROAD_CODE) | (graph.codes == dest_code)
+
+        # goals are walkable cells next to a cell of the block with the same type
+        block_cells = np.flatnonzero(
+            (self.block_ids == block_id) & (self.codes.ravel() == dest_code)
+        )
+        block_nodes = graph.cell_to_node[block_cells]
+        _, around = graph.expand(block_nodes[block_nodes >= 0])
+        frontier = np.unique(around[walkable[around]])
+        next_hop[frontier] = GOAL
+
+        while len(frontier):
+            sources, neighbours = graph.expand(frontier)
+            fresh = walkable[neighbours] & (next_hop[neighbours] == UNREACHED)
+            neighbours, first = np.unique(neighbours[fresh], return_index=True)
+            next_hop[neighbours] = sources[fresh][first]
+            frontier = neighbours
+        return next_hop
+
+    def apply_edits(self):
+        if not self.dirty:
+            return
+        old_graph, dirty = self.graph, self.dirty
+        self.dirty = []
+        self.codes = self.grid.to_codes()
+        self.graph = RoadGraph(self.codes)
+
+        # nodes inside the edits grown by one cell, a table that never reached
+        # one of them cannot see the edit
+        touched = np.zeros(self.codes.shape, dtype=bool)
+        for x1, y1, x2, y2 in dirty:
+            touched[max(y1 - 1, 0) : y2 + 2, max(x1 - 1, 0) : x2 + 2] = True
+        touched_nodes = old_graph.cell_to_node[np.flatnonzero(touched)]
+        touched_nodes = touched_nodes[touched_nodes >= 0]
+
+        old_to_new = self.graph.cell_to_node[old_graph.node_to_cell]
+        for key, table in list(self.tables.items()):
+            if (table[touched_nodes] != UNREACHED).any():
+                del self.tables[key]
+                continue
+            remapped = np.full(len(self.graph), UNREACHED, dtype=np.int32)
+            reached = np.flatnonzero(table != UNREACHED)
+            hops = table[reached]
+            remapped[old_to_new[reached]] = np.where(
+                hops >= 0, old_to_new[np.maximum(hops, 0)], hops
+            )
+            self.tables[key] = remapped
@@ -0,0 +1,103 @@
+import time
+from dataclasses import dataclass, field
+
+from components.checkpoint import load_checkpoint, save_checkpoint
+from components.disease import DiseaseParams
+from components.grid import ArrayGrid, Grid, load_grid_from_file
+from components.profiles import PopulationProfiles
+from components.profiling import NULL_PROFILER, Profiler
+from components.recorder import MetricsRecorder
+from components.simulation import Simulation
+from const import BLOCK_SIZE
+
+MINUTES_PER_DAY = 24 * 60
+
+
+@dataclass
+class RunResult:
+    population: int
+    minutes: int
+    setup_time: float
+    elapsed: float
+    simulation: Simulation = field(repr=False)
+
+    @property
+    def minutes_per_second(self) -> float:
+        return self.minutes / self.elapsed if self.elapsed else float("inf")
+
+
+def load_grid(filename: str | None = None) -> Grid:
+    """
+        Loads a saved grid without a surface to draw on
+        Parameters:
+            - filename: a .txt or .bin file in saves/ or a path, the latest save if None
+    """
+    grid = load_grid_from_file(None, BLOCK_SIZE, filename, grid_cls=ArrayGrid)
+    if grid is None:
+        raise FileNotFoundError(f"No saved grid found for {filename or 'saves/'}")
+    return grid
+
+
+def simulate(simulation: Simulation, days: int) -> tuple[int, float]:
+    # steps the simulation as fast as possible, returns (minutes, seconds taken)
+    minutes = days * MINUTES_PER_DAY
+    start = time.perf_counter()
+    simulation.advance(minutes)
+    return minutes, time.perf_counter() - start
+
+
+def run_headless(
+    grid: Grid | None,
+    days: int,
+    seed: int | None = None,
+    population: int | None = None,
+    precompute_routes: bool = False,
+    events: bool = False,
+    profiler: Profiler = NULL_PROFILER,
+    disease: DiseaseParams | None = None,
+    record: str | None = None,
+    record_positions: bool = False,
+    resume: str | None = None,
+    checkpoint: str | None = None,
+    profiles: PopulationProfiles | None = None,
+) -> RunResult:
+    """
+        Runs a simulation on `grid` for `days` simulated days without pygame
+        Parameters:
+            - seed: seed of the simulation's random generator
+            - population: number of people, random when None
+            - precompute_routes: use route tables instead of A*
+            - events: drive the simulation with the event scheduler
+            - profiler: records the counters and phase timings of the run
+            - disease: start an outbreak with these parameters
+            - record: folder to stream hourly metrics to, see MetricsRecorder
+            - record_positions: also record every position each hour
+            - resume: checkpoint folder to continue from, `grid` and the
+              population, route and disease settings are then taken from it
+            - checkpoint: folder to save the final state to, see save_checkpoint
+            - profiles: population profiles to draw the people from, see load_profiles
+    """
+    start = time.perf_counter()
+    if resume is not None:
+        simulation = load_checkpoint(resume)
+        simulation.profiler = profiler
+    else:
+        simulation = Simulation(grid, seed)
+        simulation.profiler = profiler
+        if profiles is not None:
+            simulation.profiles = profiles
+        simulation.generate_population(population)
+        if precompute_routes:
+            simulation.precompute_routes()
+        if disease is not None:
+            simulation.use_disease(params=disease, seed=seed)
+    simulation.use_events(events)
+    recorder = MetricsRecorder(simulation, record, record_positions) if record else None
+    setup_time = time.perf_counter() - start
+
+    minutes, elapsed = simulate(simulation, days)
+    if recorder is not None:
+        recorder.close()
+    if checkpoint is not None:
+        save_checkpoint(simulation, checkpoint)
+    return RunResult(len(simulation.people), minutes, setup_time, elapsed, simulation)
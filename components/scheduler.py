@@ -0,0 +1,184 @@
+from typing import TYPE_CHECKING
+
+import numpy as np
+
+from components.person import Day, PersonState
+from components.population import NUM_DAYS
+
+if TYPE_CHECKING:
+    from components.simulation import Simulation
+
+HOURS_PER_DAY = 24
+MINUTES_PER_HOUR = 60
+INFINITY = -1
+# wake-up tick of people who stay put for the rest of the day
+NEVER = np.iinfo(np.int32).max
+
+
+class EventScheduler:
+    """
+        Discrete-event driver of a Simulation, gives the same trajectory as
+        calling update_min every minute while only touching people with due
+        events
+        - a timing wheel with one slot per hour tick of the day holds the
+          staying people, filed under the tick they leave at
+        - moving people are the only ones stepped every minute
+        - when nobody is moving the clock jumps straight to the next tick
+          that has a departure or ends the day
+        `time` of staying people is derived from the tick they arrived at
+        instead of being counted every hour, call sync before reading it
+    """
+
+    def __init__(self, simulation: "Simulation"):
+        self.simulation = simulation
+        size = len(simulation.people)
+        self.wake = np.full(size, NEVER, dtype=np.int32)
+        self.since = np.zeros(size, dtype=np.int32)
+        self.wheel: list[list[int]] = [[] for _ in range(HOURS_PER_DAY + 1)]
+        self.movers: set[int] = set()
+        self.rebuild()
+
+    def stay_times(self, agents: np.ndarray) -> np.ndarray:
+        # stay time of the current stop, current_idx wrapped like Person.update
+        people = self.simulation.people
+        slot = agents.astype(np.int64) * NUM_DAYS + self.simulation.day.value
+        start = people.sched_offsets[slot]
+        length = people.sched_offsets[slot + 1] - start
+        return people.sched_time[start + people.current_idx[agents] % length]
+
+    def rebuild(self):
+        """
+            Recomputes every event from the people arrays and the clock, used
+            on start and at the beginning of every day
+        """
+        people, hrs = self.simulation.people, self.simulation.hrs
+        staying = np.flatnonzero(people.state == PersonState.Staying.value)
+        stay_time = self.stay_times(staying)
+        time = people.time[staying]
+
+        self.since[staying] = hrs - time
+        self.wake[:] = NEVER
+        self.wake[staying] = np.where(
+            stay_time == INFINITY, NEVER, hrs + np.maximum(stay_time - time, 1)
+        )
+        self.movers = set(np.flatnonzero(people.state == PersonState.Moving.value).tolist())
+
+        # file everybody leaving today into the wheel, ordered by index
+        due = staying[self.wake[staying] <= HOURS_PER_DAY]
+        due = due[np.argsort(self.wake[due], kind="stable")]
+        counts = np.bincount(self.wake[due], minlength=HOURS_PER_DAY + 1)
+        slots = np.split(due, np.cumsum(counts)[:-1])
+        self.wheel = [slot.tolist() for slot in slots]
+
+    def sync(self):
+        # writes the derived `time` of staying people back to the arrays
+        people = self.simulation.people
+        staying = people.state == PersonState.Staying.value
+        people.time[staying] = self.simulation.hrs - self.since[staying]
+
+    def schedule(self, i: int, tick: int):
+        # person i starts staying at `tick`, file their departure
+        self.since[i] = tick
+        stay_time = int(self.stay_times(np.array([i]))[0])
+        if stay_time == INFINITY:
+            self.wake[i] = NEVER
+            return
+        self.wake[i] = tick + max(stay_time, 1)
+        if self.wake[i] <= HOURS_PER_DAY:
+            self.wheel[self.wake[i]].append(i)
+
+    def tick(self, hrs: int):
+        # the hourly update of Person.update, restricted to due people
+        sim, people = self.simulation, self.simulation.people
+
+        # people already moving arrive when they stand on their next stop
+        if self.movers:
+            movers = np.fromiter(self.movers, dtype=np.int64, count=len(self.movers))
+            slot = movers * NUM_DAYS + sim.day.value
+            start = people.sched_offsets[slot]
+            length = people.sched_offsets[slot + 1] - start
+            people.current_idx[movers] %= length
+            has_next = people.current_idx[movers] + 1 < length
+            movers, start = movers[has_next], start[has_next]
+            nxt = start + people.current_idx[movers] + 1
+            arrived = movers[
+                (people.row[movers] == people.sched_row[nxt])
+                & (people.col[movers] == people.sched_col[nxt])
+            ]
+            for i in sorted(arrived.tolist()):
+                people.state[i] = PersonState.Staying.value
+                people.current_idx[i] += 1
+                sim.path_cache.pop(i, None)
+                self.movers.discard(i)
+                self.schedule(i, hrs)
+
+        # staying people whose time is up leave
+        for i in self.wheel[hrs]:
+            if self.wake[i] != hrs or people.state[i] != PersonState.Staying.value:
+                continue
+            people.current_idx[i] %= len(people.day_schedule(i, sim.day))
+            people.state[i] = PersonState.Moving.value
+            people.time[i] = 0
+            self.wake[i] = NEVER
+            self.movers.add(i)
+        self.wheel[hrs] = []
+
+    def step(self):
+        # one simulated minute, same as Simulation.update_min
+        sim = self.simulation
+        profiler = sim.profiler
+        with profiler.time("update_min"):
+            sim.secs += 1
+            if sim.secs == MINUTES_PER_HOUR:
+                sim.secs = 0
+                sim.hrs += 1
+                with profiler.time("update_hr"):
+                    self.tick(sim.hrs)
+                sim.hour_passed()
+                if sim.hrs == HOURS_PER_DAY:
+                    sim.hrs = 0
+                    sim.day = Day((sim.day.value + 1) % NUM_DAYS)
+                    sim.people.day_changed(sim.day)
+                    self.rebuild()
+
+            with profiler.time("move_agents"):
+                movers = sorted(self.movers)
+                for i in movers:
+                    if sim.move_person(i):
+                        self.movers.discard(i)
+                        self.schedule(i, sim.hrs)
+            profiler.count("agents_moved", len(movers))
+
+    def minutes_to_next_event(self) -> int:
+        # minutes until the next tick with departures, or the end of the day,
+        # every tick is an event while something needs every hour
+        sim = self.simulation
+        tick = next(
+            (
+                h
+                for h in range(sim.hrs + 1, HOURS_PER_DAY)
+                if self.wheel[h] or sim.needs_every_hour
+            ),
+            HOURS_PER_DAY,
+        )
+        return (tick - sim.hrs) * MINUTES_PER_HOUR - sim.secs
+
+    def advance(self, minutes: int):
+        """
+            Runs `minutes` simulated minutes, idle stretches with nobody moving
+            are skipped in one jump
+        """
+        sim = self.simulation
+        done = 0
+        while done < minutes:
+            if not self.movers:
+                # every minute before the next event is a no-op
+                skip = min(self.minutes_to_next_event() - 1, minutes - done)
+                if skip > 0:
+                    sim.hrs, sim.secs = divmod(
+                        sim.hrs * MINUTES_PER_HOUR + sim.secs + skip, MINUTES_PER_HOUR
+                    )
+                    done += skip
+                    continue
+            self.step()
+            done += 1
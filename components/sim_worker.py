@@ -0,0 +1,251 @@
+import multiprocessing
+import time
+from dataclasses import dataclass
+from multiprocessing import resource_tracker, shared_memory
+from multiprocessing.connection import Connection
+
+import numpy as np
+
+from components.grid import ArrayGrid, Grid
+from components.person import Day
+from components.population import NUM_DAYS, PopulationArrays
+from components.simulation import Simulation
+from components.timer import SimulationClock
+
+# control block: index of the latest complete buffer, then the sequence
+# number of each buffer, odd while the worker is writing it
+CONTROL_SIZE = 3
+# clock block of a buffer: day, hrs, secs, simulated minutes so far
+CLOCK_SIZE = 4
+
+
+def _aligned(nbytes: int) -> int:
+    # every block starts 8 byte aligned
+    return -(-nbytes // 8) * 8
+
+
+@dataclass
+class Snapshot:
+    day: Day
+    hrs: int
+    secs: int
+    minutes: int
+    row: np.ndarray
+    col: np.ndarray
+    state: np.ndarray
+
+
+class SnapshotBuffer:
+    """
+        Double-buffered snapshot of agent positions and the clock in shared
+        memory, one writer and any number of readers
+        The writer fills the buffer readers are not pointed at and then
+        flips `latest`, every buffer carries a sequence number that is odd
+        during a write so a reader can tell a torn copy and retry
+    """
+
+    def __init__(self, buf: memoryview, size: int):
+        self.size = size
+        offset = 0
+
+        def view(dtype, count):
+            nonlocal offset
+            arr = np.ndarray(count, dtype=dtype, buffer=buf, offset=offset)
+            offset += _aligned(arr.nbytes)
+            return arr
+
+        self.control = view(np.int64, CONTROL_SIZE)
+        self.buffers = [
+            (view(np.int64, CLOCK_SIZE), view(np.int32, size), view(np.int32, size), view(np.int8, size))
+            for _ in range(2)
+        ]
+
+    @staticmethod
+    def nbytes(size: int) -> int:
+        buffer = _aligned(CLOCK_SIZE * 8) + 2 * _aligned(size * 4) + _aligned(size)
+        return _aligned(CONTROL_SIZE * 8) + 2 * buffer
+
+    def write(self, simulation: Simulation, minutes: int):
+        b = 1 - int(self.control[0])
+        seq = self.control[1 + b]
+        self.control[1 + b] = seq + 1
+        clock, row, col, state = self.buffers[b]
+        clock[:] = (simulation.day.value, simulation.hrs, simulation.secs, minutes)
+        row[:] = simulation.people.row
+        col[:] = simulation.people.col
+        state[:] = simulation.people.state
+        self.control[1 + b] = seq + 2
+        self.control[0] = b
+
+    def read(self, retries: int = 100) -> Snapshot | None:
+        # a copy of the latest complete buffer, None until one was published
+        for _ in range(retries):
+            b = int(self.control[0])
+            seq = int(self.control[1 + b])
+            if seq == 0:
+                return None
+            if seq % 2:
+                continue
+            clock, row, col, state = self.buffers[b]
+            day, hrs, secs, minutes = clock.tolist()
+            snapshot = Snapshot(Day(day), hrs, secs, minutes, row.copy(), col.copy(), state.copy())
+            if int(self.control[1 + b]) == seq:
+                return snapshot
+        return None
+
+
+def _run_worker(
+    conn: Connection,
+    codes: np.ndarray,
+    grid_size: int,
+    population: int | None,
+    seed: int | None,
+    events: bool,
+    rate: float,
+    speed: float,
+):
+    grid = ArrayGrid.from_codes(codes, grid_size, None)
+    simulation = Simulation(grid, seed)
+    simulation.generate_population(population)
+    simulation.use_events(events)
+
+    # the UI owns the shared memory, sized once the population is known
+    conn.send(len(simulation.people))
+    shm = shared_memory.SharedMemory(name=conn.recv())
+    snapshots = SnapshotBuffer(shm.buf, len(simulation.people))
+    snapshots.write(simulation, 0)
+
+    clock = SimulationClock(simulation.update_min, rate, speed, budget=1 / 60)
+    clock.start_timer()
+    minutes = 0
+    try:
+        while True:
+            while conn.poll():
+                command, value = conn.recv()
+                if command == "stop":
+                    return
+                if command == "speed":
+                    clock.set_speed(value)
+            steps = clock.update()
+            if steps:
+                minutes += steps
+                snapshots.write(simulation, minutes)
+            else:
+                # sleep until about the next step is due
+                time.sleep(min(1 / (clock.rate * clock.speed), 1 / 120))
+    finally:
+        del snapshots
+        shm.close()
+
+
+class SimulationWorker:
+    """
+        Runs a Simulation in a background process so a slow step never blocks
+        the UI, the UI only reads the latest complete snapshot of the agent
+        positions and the clock from shared memory
+        The worker simulates a copy of the grid taken when it starts, later
+        edits of the map are not seen by it
+        Methods:
+        - start : spawns the worker, it generates the population and runs
+        - latest : a copy of the latest snapshot
+        - apply : copies the latest snapshot into a simulation used for drawing
+        - set_speed : changes the speed multiplier of the worker clock
+        - stop : stops the worker and frees the shared memory
+    """
+
+    def __init__(
+        self,
+        grid: Grid,
+        population: int | None = None,
+        seed: int | None = None,
+        events: bool = True,
+        rate: float = 120,
+        speed: float = 1,
+    ):
+        """
+            Parameters:
+                - events: step with the event scheduler, see Simulation.use_events
+                - rate, speed: simulated minutes per real second at 1x and the multiplier
+        """
+        self.grid = grid
+        self.population = population
+        self.seed = seed
+        self.events = events
+        self.rate = rate
+        self.speed = speed
+        self.process: multiprocessing.Process | None = None
+        self.conn: Connection | None = None
+        self.shm: shared_memory.SharedMemory | None = None
+        self.snapshots: SnapshotBuffer | None = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.process is not None and self.process.is_alive()
+
+    def start(self):
+        # the worker has to share our resource tracker, otherwise its own
+        # tracker reports the shared memory it attached to as leaked
+        resource_tracker.ensure_running()
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(
+            target=_run_worker,
+            args=(
+                child,
+                self.grid.to_codes().copy(),
+                self.grid.grid_size,
+                self.population,
+                self.seed,
+                self.events,
+                self.rate,
+                self.speed,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+
+        size = self.conn.recv()
+        self.shm = shared_memory.SharedMemory(create=True, size=SnapshotBuffer.nbytes(size))
+        self.snapshots = SnapshotBuffer(self.shm.buf, size)
+        self.snapshots.control[:] = 0
+        self.conn.send(self.shm.name)
+
+    def set_speed(self, speed: float):
+        self.speed = min(max(speed, SimulationClock.MIN_SPEED), SimulationClock.MAX_SPEED)
+        if self.conn is not None:
+            self.conn.send(("speed", self.speed))
+
+    def latest(self) -> Snapshot | None:
+        if self.snapshots is None:
+            return None
+        return self.snapshots.read()
+
+    def apply(self, simulation: Simulation) -> bool:
+        # returns False while no snapshot was published
+        snapshot = self.latest()
+        if snapshot is None:
+            return False
+        size = len(snapshot.row)
+        if len(simulation.people) != size:
+            # positions only, the schedules stay in the worker
+            simulation.people = PopulationArrays(
+                np.zeros(size * NUM_DAYS + 1), [], [], [], snapshot.row, snapshot.col
+            )
+        else:
+            simulation.people.row[:] = snapshot.row
+            simulation.people.col[:] = snapshot.col
+        simulation.people.state[:] = snapshot.state
+        simulation.day, simulation.hrs, simulation.secs = snapshot.day, snapshot.hrs, snapshot.secs
+        return True
+
+    def stop(self):
+        if self.process is not None:
+            assert self.conn is not None
+            if self.process.is_alive():
+                self.conn.send(("stop", None))
+            self.process.join()
+            self.process = None
+        if self.shm is not None:
+            self.snapshots = None
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
@@ -1,303 +1,317 @@
 import random
-from typing import DefaultDict
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
 
-import pygame
+import numpy as np
 from components.grid import Grid, GridState
-from components.person import Day, Person, PersonState, TimeTable
-
-
-PLACES = [
-    GridState.OFFICE,
-    GridState.MALL,
-    GridState.SCHOOL,
-    GridState.PARK,
-]
-
-
-def get_min_max_time_limit(state: GridState) -> tuple[int, int]:
-    if state == GridState.OFFICE:
-        return 4, 8
-    elif state == GridState.MALL:
-        return 4, 10
-    elif state == GridState.SCHOOL:
-        return 8, 12
-    elif state == GridState.PARK:
-        return 2, 6
-    raise Exception("Invalid state")
+from components.disease import Disease, DiseaseParams
+from components.labelling import NO_BLOCK, BlockLabels, closest_road, label_blocks
+from components.path_cache import PathCache, Route, Trip
+from components.pathfinding import a_star
+from components.profiling import NULL_PROFILER, Profiler
+from components.routes import RouteTable
+from components.scheduler import EventScheduler
+from components.spatial_index import SpatialIndex
+from components.person import Day, Person, PersonState
+from components.population import PersonView, PopulationArrays
+from components.profiles import HOUSE_CODE, PopulationProfiles, default_profiles
+
+if TYPE_CHECKING:
+    from components.renderer import AgentRenderer
 
 
 class Simulation:
-    def __init__(self, grid: Grid):
+    def __init__(self, grid: Grid, seed: int | None = None):
         self.cols, self.rows = grid.cols, grid.rows
         self.block_ids: list[list[int]] = [[-1] * grid.cols for _ in range(grid.rows)]
-        self.people: list[Person] = []
-        self.path_cache = {}
+        # capacities and bounding boxes of the blocks, set by label_blocks
+        self.block_labels: BlockLabels | None = None
+        self.people = PopulationArrays.empty()
+        self.spatial_index = SpatialIndex(
+            np.asarray(self.block_ids), self.people.row, self.people.col
+        )
+        # the trip of every moving person, keyed by index in self.people
+        self.path_cache: dict[int, Trip] = {}
+        # routes shared between people, keyed by (entry road, destination block)
+        self.route_cache = PathCache()
+        # optional next-hop tables that replace A*, see precompute_routes
+        self.route_table: RouteTable | None = None
+        # discrete-event driver replacing the per minute scan, see use_events
+        self.scheduler: EventScheduler | None = None
         self.hrs: int = 0
         self.secs: int = 0
         self.day = Day.Monday
+        # batched people drawing, created on the first draw
+        self.agent_renderer: "AgentRenderer | None" = None
+        # optional SEIR layer stepped every simulated hour, see use_disease
+        self.disease: Disease | None = None
+        # called with no arguments on every hour tick, see hour_passed
+        self.hour_listeners: list[Callable[[], None]] = []
+        # counters and phase timings, records nothing unless replaced
+        self.profiler: Profiler = NULL_PROFILER
+        # who the people are and where they go, see generate_population
+        self.profiles: PopulationProfiles = default_profiles()
+        # every random draw of the simulation goes through this generator
+        self.rng = random.Random(seed)
 
         self.grid = grid
-
-    def draw(self): 
-        # draw the pepole as circles
-        for person in self.people:
-            r, c = person.loc
-            rect = pygame.Rect(
-                c * self.grid.grid_size,
-                r * self.grid.grid_size,
-                self.grid.grid_size,
-                self.grid.grid_size,
-            )
-            pygame.draw.circle(self.grid.surface, (255, 0, 0), rect.center, 10)
-
-
-    def generate_population(self):
-        blocks = [[-1 for _ in range(self.cols)] for _ in range(self.rows)]
-        block_id_to_capacity = DefaultDict(int)
-        block_id = 0
-        sm_blocks = 0
-
-        def dfs(c, r, block_id):
-            nonlocal sm_blocks
-            if (
-                not self.grid.check_in_bounds(c, r)
-                or blocks[r][c] != -1
-                or self.grid[r, c] == GridState.EMPTY
-            ):
-                return
-            if self.grid[r, c] == GridState.ROAD:
-                return
-            blocks[r][c] = block_id
-            sm_blocks += 1
-            block_id_to_capacity[block_id] += 1
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                dfs(c + dx, r + dy, block_id)
-
-        for r in range(self.rows):
-            for c in range(self.cols):
-                if not blocks[r][c] == -1:
-                    continue
-                if (
-                    self.grid[r, c] == GridState.EMPTY
-                    or self.grid[r, c] == GridState.ROAD
-                ):
-                    continue
-                dfs(c, r, block_id)
-                block_id += 1
+        # uint8 GRID_CODES of the grid and the road each place enters the
+        # road network at, both dropped whenever the grid is edited
+        self._codes = None
+        self.entry_roads: dict[tuple[int, int], tuple[int, int]] = {}
+        grid.add_listener(self.on_grid_change)
+
+    def on_grid_change(self, x1: int, y1: int, x2: int, y2: int):
+        self.route_cache.clear()
+        self._codes = None
+        self.entry_roads.clear()
+
+    @property
+    def codes(self):
+        if self._codes is None:
+            self._codes = self.grid.to_codes()
+        return self._codes
+
+    def draw(self, surface=None, zoom: float = 1.0, offset: tuple[int, int] = (0, 0)):
+        """
+            Draws the people, culled to the clip rect of the surface
+            Parameters:
+                - surface: drawn on the grid surface in map pixels if None
+                - zoom, offset: map pixel to screen transform, screen = map * zoom + offset
+        """
+        if self.agent_renderer is None:
+            # imported here so headless runs never load pygame
+            from components.renderer import AgentRenderer
+
+            self.agent_renderer = AgentRenderer(self)
+        surface = surface if surface is not None else self.grid.surface
+        self.agent_renderer.draw(surface, zoom, offset)
+
+    def label_blocks(self) -> list[list[int]]:
+        self.block_labels = label_blocks(self.codes)
+        blocks = self.block_labels.labels.tolist()
 
         self.block_ids = blocks
-
-        # collect avaiable blocks
-        available_blocks = {
-            (r, c)
-            for c in range(self.cols)
-            for r in range(self.rows)
-            if blocks[r][c] != -1
-            and self.grid[r, c] not in [GridState.HOUSE, GridState.ROAD]
-        }
-
-        # collect available houses
-        available_houses = {
-            (r, c)
-            for c in range(self.cols)
-            for r in range(self.rows)
-            if blocks[r][c] != -1 and self.grid[r, c] == GridState.HOUSE
-        }
+        # block ids changed, routes built on the old labels are meaningless
+        self.route_cache.clear()
+        if self.route_table is not None:
+            self.route_table.close()
+            self.route_table = None
+        return blocks
+
+    def generate_population(self, population: int | None = None):
+        """
+            Draws a new population from self.profiles, every person gets their
+            own house and an itinerary for every day
+            Parameters:
+                - population: number of people, the profiles' population or
+                  random when None, never more than the houses
+        """
+        start = time.perf_counter()
+        with self.profiler.time("label_blocks"):
+            self.label_blocks()
+        assert self.block_labels is not None
+
+        codes = self.codes.ravel()
+        in_block = self.block_labels.labels.ravel() != NO_BLOCK
+        houses = int(np.count_nonzero(in_block & (codes == HOUSE_CODE)))
 
         # collect max capacity of people
-        max_people_capacity = len(available_houses)
+        max_people_capacity = houses
 
         print("Max people capacity: ", max_people_capacity)
-        print("Available blocks: ", len(available_blocks))
-        print("Available houses: ", len(available_houses))
+        print("Available blocks: ", int(np.count_nonzero(in_block)) - houses)
+        print("Available houses: ", houses)
 
         # generate population
-        population = random.randint(0, max_people_capacity)
-
-        def get_random_person() -> Person:
-            house_location = random.choice(list(available_houses))
-            # remove the house from the available houses
-            available_houses.remove(house_location)
-            # get house id
-            house_id = house_location
-
-            return Person(
-                TimeTable(
-                    Monday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                    Tuesday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                    Wednesday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                    Thursday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                    Friday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                    Saturday=[(house_id, random.randint(4, 8)), (house_id, -1)],
-                ),
-                loc=house_location,
-            )
-
-        # generate people
-        people = [get_random_person() for _ in range(population)]
-        for day in range(0, 6):
-            available_cpy = available_blocks.copy()
-            for person in people:
-                day_schedule = person.get_day_schedule(Day(day))
-                # pick from available_blocks
-                r, c = random.choice(list(available_cpy))
-                # remove the place from available blocks
-                available_cpy.remove((r, c))
-
-                # get the block block_type
-                rand_place_type = self.grid[r, c]
-
-                # get random time limit
-                rand_time = random.randint(*get_min_max_time_limit(rand_place_type))
-
-                # insert the place into the day schedule
-                day_schedule.insert(1, ((r, c), rand_time))
-
-        self.people = people
+        if population is None:
+            population = self.profiles.population
+        if population is None:
+            population = self.rng.randint(0, max_people_capacity)
+        population = min(population, max_people_capacity)
+
+        # numpy draws seeded from self.rng so a seed still fixes the population
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        self.people, overflow = self.profiles.sample(rng, codes, in_block, self.cols, population)
+        if overflow:
+            print("Visits over capacity: ", overflow)
+            self.profiler.count("visits_over_capacity", overflow)
+        self.rebuild_spatial_index()
+        if self.scheduler is not None:
+            self.scheduler = EventScheduler(self)
+        if self.disease is not None:
+            self.use_disease(params=self.disease.params, seed=self.disease.seed)
+        self.profiler.record("generate_population", time.perf_counter() - start)
 
 
     def update_hr(self):
-        for person in self.people:
-            person.update(self.day)
+        with self.profiler.time("update_hr"):
+            self.people.update(self.day)
+            # people who reached their destination here must not keep their trip
+            for i in [i for i in self.path_cache if self.people[i].state != PersonState.Moving]:
+                del self.path_cache[i]
+        self.hour_passed()
+
+    def use_disease(
+        self, enabled: bool = True, params: DiseaseParams | None = None, seed: int | None = None
+    ):
+        """
+            Starts an outbreak among the current people, or removes the disease
+            layer, generate_population restarts it for the new people
+        """
+        self.disease = Disease(self, params or DiseaseParams(), seed) if enabled else None
+
+    def hour_passed(self):
+        # called on every hour tick, after the hourly update of the people
+        if self.disease is not None:
+            with self.profiler.time("disease"):
+                self.disease.step_hour()
+        for listener in self.hour_listeners:
+            listener()
+
+    @property
+    def needs_every_hour(self) -> bool:
+        # something has to see every hour, so idle hours cannot be skipped
+        return self.disease is not None or bool(self.hour_listeners)
+
+    def rebuild_spatial_index(self):
+        self.spatial_index = SpatialIndex(
+            np.asarray(self.block_ids), self.people.row, self.people.col
+        )
+
+    def people_at(self, loc: tuple[int, int]) -> list[PersonView]:
+        return [self.people[i] for i in self.spatial_index.people_at(*loc)]
+
+    def occupants(self, block_id: int) -> list[PersonView]:
+        return [self.people[i] for i in self.spatial_index.occupants(block_id)]
+
+    def use_events(self, enabled: bool = True):
+        """
+            Switches between the event scheduler and scanning every person
+            each minute, both give the same trajectory
+        """
+        if enabled and self.scheduler is None:
+            self.scheduler = EventScheduler(self)
+        elif not enabled and self.scheduler is not None:
+            self.scheduler.sync()
+            self.scheduler = None
+
+    def advance(self, minutes: int):
+        # runs `minutes` simulated minutes, idle ones are skipped with events
+        if self.scheduler is not None:
+            self.scheduler.advance(minutes)
+            return
+        for _ in range(minutes):
+            self.update_min()
 
     def update_min(self):
-        self.secs += 1
-        if self.secs == 60:
-            self.secs = 0
-            self.hrs += 1
-            self.update_hr()
-            if self.hrs == 24:
-                self.hrs = 0
-                self.day = Day((self.day.value + 1) % 6)
-                for p in self.people:
-                    p.day_changed(self.day)
-        # move the person if they are in moving state
-        moving_persons = [
-            (i, person)
-            for i, person in enumerate(self.people)
-            if person.state == PersonState.Moving
-        ]
-
-        for i, person in moving_persons:
-            if i in self.path_cache:
-                path = self.path_cache[i]
-            else:
-                path = self.calculate_path(person)
-                self.path_cache[i] = path
-
-            path_completed = path is None or len(path) == 0
-            if path_completed:
-                # remove the path from the cache 
-                self.path_cache.pop(i)
-                # change the persons state to staying 
-                person.state = PersonState.Staying
-                # go to the current location 
-                person.current_idx += 1
-                continue
-
-            dest = path.pop(0)
-            person.loc = dest
+        if self.scheduler is not None:
+            self.scheduler.step()
+            return
+
+        profiler = self.profiler
+        with profiler.time("update_min"):
+            self.secs += 1
+            if self.secs == 60:
+                self.secs = 0
+                self.hrs += 1
+                self.update_hr()
+                if self.hrs == 24:
+                    self.hrs = 0
+                    self.day = Day((self.day.value + 1) % 6)
+                    self.people.day_changed(self.day)
+            # move the person if they are in moving state
+            with profiler.time("move_agents"):
+                moving = np.flatnonzero(self.people.state == PersonState.Moving.value)
+
+                for i in moving.tolist():
+                    self.move_person(i)
+            profiler.count("agents_moved", len(moving))
+
+    def move_person(self, i: int) -> bool:
+        """
+            Moves a moving person one cell along their trip
+            Returns:
+                True when the trip was already over and they started staying
+        """
+        person = self.people[i]
+        trip = self.path_cache.get(i)
+        if trip is None:
+            trip = Trip(self.get_route(person), person.get_dest(self.day))
+            self.path_cache[i] = trip
+
+        loc = trip.next_loc()
+        if loc is None:
+            # remove the path from the cache 
+            self.path_cache.pop(i)
+            # change the persons state to staying 
+            person.state = PersonState.Staying
+            # go to the current location 
+            person.current_idx += 1
+            return True
+
+        person.loc = loc
+        self.spatial_index.move(i, *loc)
+        return False
 
     def get_closest_road(self, loc: tuple[int, int]) -> tuple[int, int] | None:
         # find the nearest road which should be connected to the current block
-        def dfs(r, c, self_state: GridState, visited: set):
-            if not self.check_in_bounds(c, r) or (r, c) in visited:
-                return None
-            if self.grid[r, c] == GridState.ROAD:
-                return r, c
-            if self.grid[r, c] != self_state:
-                return None
-            visited.add((r, c))
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                point = dfs(r + dy, c + dx, self_state, visited)
-                if point is not None:
-                    return point
-
-        visited = set()
-        r, c = loc
-        return dfs(r, c, self.grid[r, c], visited)
+        return closest_road(self.codes, loc)
 
-    def calculate_path(self, person: Person):
-        r, c = person.loc
+    def get_entry_road(self, loc: tuple[int, int]) -> tuple[int, int]:
+        road_loc = self.entry_roads.get(loc)
+        if road_loc is not None:
+            return road_loc
+        r, c = loc
         # check if the person isn't on a road
-        road_loc = None
         if self.grid[r, c] == GridState.ROAD:
             road_loc = r, c
-        road_loc = road_loc or self.get_closest_road(person.loc)
+        road_loc = road_loc or self.get_closest_road(loc)
         if road_loc is None:
-            raise Exception(f"No road found from location {person.loc}")
+            raise Exception(f"No road found from location {loc}")
+        self.entry_roads[loc] = road_loc
+        return road_loc
 
-        src = road_loc
-        dest = person.get_dest(self.day)
+    def calculate_path(self, person: Person | PersonView):
+        src = self.get_entry_road(person.loc)
+        return self.find_path(src, person.get_dest(self.day))
+
+    def find_path(self, src, dest):
+        if self.route_table is not None:
+            return self.route_table.get_path(src, dest)
         return self.get_a_star_path(src, dest)
 
+    def get_route(self, person: Person | PersonView) -> Route:
+        """
+            The shared route of a person's next trip without the final
+            destination cell, served from route_cache when possible
+        """
+        src = self.get_entry_road(person.loc)
+        dest = person.get_dest(self.day)
+        key = (src, self.block_ids[dest[0]][dest[1]])
+        route = self.route_cache.get(key)
+        if route is None:
+            self.profiler.count("route_cache_misses")
+            with self.profiler.time("find_path"):
+                route = tuple(self.find_path(src, dest)[:-1])
+            self.route_cache.put(key, route)
+        else:
+            self.profiler.count("route_cache_hits")
+        return route
+
+    def precompute_routes(self):
+        """
+            Builds next-hop tables towards every block in the people's
+            schedules, after this calculate_path no longer runs A*
+        """
+        self.route_table = RouteTable(self.grid, self.block_ids)
+        self.route_table.precompute(
+            zip(self.people.sched_row.tolist(), self.people.sched_col.tolist())
+        )
+
     def get_a_star_path(self, src, dest):
-        r, c = dest
-        dest_type = self.grid[r, c]
-
-        def match(p1: tuple[int, int], p2: tuple[int, int]) -> bool:
-            r, c = p1
-            p1_id = self.block_ids[r][c]
-            r, c = p2
-            p2_id = self.block_ids[r][c]
-            return p1_id == p2_id
-
-        def is_dest(loc: tuple[int, int]) -> bool:
-            ng = get_neighbours(loc)
-            for n in ng:
-                if match(n, dest):
-                    return True
-            return False
-
-        def h(loc1, loc2):
-            return abs(loc1[0] - loc2[0]) + abs(loc1[1] - loc2[1])
-
-        def get_neighbours(loc):
-            r, c = loc
-            neighbours = []
-            for dx, dy in [(1, 0), (-1, 0), (0, 1), (0, -1)]:
-                if self.check_in_bounds(c + dx, r + dy) and self.grid[r + dy, c + dx] in [GridState.ROAD, dest_type]:
-                    neighbours.append((r + dy, c + dx))
-            return neighbours
-
-        # find the path from src to dest
-        def a_star(src, dest):
-            open_list = [src]
-            visited_set = set()
-            g = {src: 0}
-            f = {src: h(src, dest)}
-            came_from = dict()
-
-            while open_list:
-                current = min(open_list, key=lambda x: f[x])
-                if is_dest(current):
-                    path = [dest]
-                    while current != src:
-                        path.append(current)
-                        current = came_from[current]
-                    path.append(src)
-                    return path[::-1]
-
-                open_list.remove(current)
-                visited_set.add(current)
-
-                for neighbour in get_neighbours(current):
-                    if neighbour in visited_set:
-                        continue
-                    if neighbour not in open_list:
-                        open_list.append(neighbour)
-
-                    tentative_g = g[current] + 1
-                    if tentative_g >= g.get(neighbour, float("inf")):
-                        continue
-
-                    came_from[neighbour] = current
-                    g[neighbour] = tentative_g
-                    f[neighbour] = g[neighbour] + h(neighbour, dest)
-
-            return []
-
-        return a_star(src, dest)
+        return a_star(self.grid, self.block_ids, src, dest, self.profiler)
 
     def check_in_bounds(self, c: int, r: int):
         return self.grid.check_in_bounds(c, r)
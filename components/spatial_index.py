@@ -0,0 +1,122 @@
+import numpy as np
+
+NONE = -1
+
+
+class SpatialIndex:
+    """
+        Who is in a cell or a block right now, kept up to date as people move
+        Every cell and every block holds an intrusive doubly linked list of
+        person indices stored in flat int32 arrays, so moving a person is O(1)
+        and listing the people of a cell or block is O(occupants)
+        Attributes:
+            - cell_count: people per flat cell index (r * cols + c)
+            - block_count: people per block id
+            - person_block: block id of every person's cell, -1 on roads
+    """
+
+    def __init__(self, block_ids: np.ndarray, rows: np.ndarray, cols: np.ndarray):
+        """
+            Parameters:
+                - block_ids: (rows, cols) array of Simulation.block_ids
+                - rows, cols: location of every person
+        """
+        self.cols = block_ids.shape[1]
+        self.block_of_cell = np.asarray(block_ids, dtype=np.int32).ravel()
+        num_cells = len(self.block_of_cell)
+        num_blocks = int(self.block_of_cell.max(initial=NONE)) + 1
+
+        self.person_cell = np.asarray(rows, dtype=np.int32) * self.cols + cols
+        self.person_block = self.block_of_cell[self.person_cell]
+
+        self.cell_head, self.cell_next, self.cell_prev = self._link_all(
+            self.person_cell, num_cells
+        )
+        on_block = self.person_block != NONE
+        self.block_head, self.block_next, self.block_prev = self._link_all(
+            np.where(on_block, self.person_block, num_blocks), num_blocks + 1
+        )
+        # people on roads were linked into a spare last list, drop it
+        self.block_head = self.block_head[:num_blocks]
+        self.block_next[~on_block] = NONE
+        self.block_prev[~on_block] = NONE
+
+        self.cell_count = np.bincount(self.person_cell, minlength=num_cells).astype(np.int32)
+        self.block_count = np.bincount(
+            self.person_block[on_block], minlength=num_blocks
+        ).astype(np.int32)
+
+    @staticmethod
+    def _link_all(keys: np.ndarray, num_keys: int):
+        # builds the lists of every key at once, each list ordered by index
+        order = np.argsort(keys, kind="stable").astype(np.int32)
+        sorted_keys = keys[order]
+        same_as_next = sorted_keys[:-1] == sorted_keys[1:]
+
+        nxt = np.full(len(keys), NONE, dtype=np.int32)
+        prv = np.full(len(keys), NONE, dtype=np.int32)
+        nxt[order[:-1][same_as_next]] = order[1:][same_as_next]
+        prv[order[1:][same_as_next]] = order[:-1][same_as_next]
+
+        head = np.full(num_keys, NONE, dtype=np.int32)
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = ~same_as_next
+        head[sorted_keys[first]] = order[first]
+        return head, nxt, prv
+
+    @staticmethod
+    def _unlink(i: int, key: int, head: np.ndarray, nxt: np.ndarray, prv: np.ndarray):
+        before, after = prv[i], nxt[i]
+        if before != NONE:
+            nxt[before] = after
+        else:
+            head[key] = after
+        if after != NONE:
+            prv[after] = before
+        nxt[i] = prv[i] = NONE
+
+    @staticmethod
+    def _link(i: int, key: int, head: np.ndarray, nxt: np.ndarray, prv: np.ndarray):
+        after = head[key]
+        nxt[i] = after
+        prv[i] = NONE
+        if after != NONE:
+            prv[after] = i
+        head[key] = i
+
+    def move(self, i: int, r: int, c: int):
+        cell = r * self.cols + c
+        old_cell = self.person_cell[i]
+        if cell == old_cell:
+            return
+        self._unlink(i, old_cell, self.cell_head, self.cell_next, self.cell_prev)
+        self._link(i, cell, self.cell_head, self.cell_next, self.cell_prev)
+        self.cell_count[old_cell] -= 1
+        self.cell_count[cell] += 1
+        self.person_cell[i] = cell
+
+        block, old_block = self.block_of_cell[cell], self.person_block[i]
+        if block == old_block:
+            return
+        if old_block != NONE:
+            self._unlink(i, old_block, self.block_head, self.block_next, self.block_prev)
+            self.block_count[old_block] -= 1
+        if block != NONE:
+            self._link(i, block, self.block_head, self.block_next, self.block_prev)
+            self.block_count[block] += 1
+        self.person_block[i] = block
+
+    def _walk(self, head: int, nxt: np.ndarray) -> list[int]:
+        people = []
+        while head != NONE:
+            people.append(int(head))
+            head = nxt[head]
+        return people
+
+    def people_at(self, r: int, c: int) -> list[int]:
+        return self._walk(self.cell_head[r * self.cols + c], self.cell_next)
+
+    def occupants(self, block_id: int) -> list[int]:
+        if not 0 <= block_id < len(self.block_head):
+            return []
+        return self._walk(self.block_head[block_id], self.block_next)
@@ -51,3 +51,102 @@ class Timer():
     def stop(self):
         self.start = False
         self.start_time = 0
+
+
+class SimulationClock():
+    """
+        Fixed-step clock that drives a simulation from the game loop
+        Real time is added to an accumulator every frame and as many steps as
+        are due are run, so frame hitches are caught up instead of lost
+        The steps of one frame are capped by an adaptive limit derived from
+        the measured cost of a step, so frame time stays within `budget`, the
+        backlog past that cap is dropped
+        Methods:
+        - update : should be in game loop, runs the due steps
+        - start_timer : starts the clock
+        - stop_timer : stops the clock
+        - set_speed : changes the speed multiplier
+    """
+
+    MIN_SPEED = 1
+    MAX_SPEED = 10_000
+
+    def __init__(self, step: Callable[[], None], rate: float = 120, speed: float = 1, budget: float = 1 / 120) -> None:
+        """
+            Parameters:
+                - step: advances the simulation by one step (minute)
+                - rate: steps per real second at 1x
+                - speed: speed multiplier, 1 to 10000
+                - budget: real seconds per frame the steps may take
+        """
+        self.step = step
+        self.rate = rate
+        self.budget = budget
+        self.speed = 1.0
+        self.set_speed(speed)
+        self.start = False
+        self.last_time = 0.0
+        self.accumulator = 0.0
+        # moving average of the seconds one step takes
+        self.step_cost = 0.0
+        # metrics of the last update and totals
+        self.steps_last_frame = 0
+        self.total_steps = 0
+        self.dropped_steps = 0
+        self.effective_speed = 0.0
+
+    @property
+    def is_running(self) -> bool:
+        return self.start
+
+    @property
+    def max_steps(self) -> int | None:
+        # adaptive cap on the steps of one frame, None until a step was timed
+        if self.step_cost <= 0:
+            return None
+        return max(1, int(self.budget / self.step_cost))
+
+    def set_speed(self, speed: float):
+        self.speed = min(max(speed, self.MIN_SPEED), self.MAX_SPEED)
+
+    def start_timer(self):
+        self.start = True
+        self.last_time = time.perf_counter()
+        self.accumulator = 0.0
+
+    def stop_timer(self):
+        self.start = False
+        self.accumulator = 0.0
+
+    def update(self) -> int:
+        # returns the number of steps run this frame
+        if not self.start:
+            return 0
+        now = time.perf_counter()
+        elapsed = now - self.last_time
+        self.last_time = now
+        self.accumulator += elapsed * self.rate * self.speed
+
+        due = int(self.accumulator)
+        limit = due if self.max_steps is None else min(due, self.max_steps)
+        steps = 0
+        while steps < limit:
+            self.step()
+            steps += 1
+            if time.perf_counter() - now > self.budget:
+                break
+        spent = time.perf_counter() - now
+
+        if steps:
+            cost = spent / steps
+            self.step_cost = cost if self.step_cost == 0 else 0.8 * self.step_cost + 0.2 * cost
+        self.accumulator -= steps
+        # the backlog the cap could not run is dropped, not carried forever
+        if self.accumulator >= 1 and steps < due:
+            self.dropped_steps += int(self.accumulator)
+            self.accumulator -= int(self.accumulator)
+
+        self.steps_last_frame = steps
+        self.total_steps += steps
+        self.effective_speed = steps / (elapsed * self.rate) if elapsed > 0 else 0.0
+        return steps
@@ -0,0 +1,120 @@
+import argparse
+
+from components.ensemble import make_replicas, run_ensemble
+from components.disease import DiseaseParams
+from components.profiles import load_profiles
+from components.profiling import NULL_PROFILER, Profiler
+from components.runner import load_grid, run_headless
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run the simulation on a saved grid without a display"
+    )
+    parser.add_argument(
+        "grid", nargs="?", help="a file in saves/ or a path, defaults to the latest save"
+    )
+    parser.add_argument("--days", type=int, default=1, help="simulated days to run")
+    parser.add_argument("--seed", type=int, help="seed of the random generator")
+    parser.add_argument(
+        "--population",
+        type=int,
+        nargs="+",
+        help="number of people, several values are handed out to replicas in turn",
+    )
+    parser.add_argument(
+        "--routes", action="store_true", help="precompute route tables instead of A*"
+    )
+    parser.add_argument(
+        "--events", action="store_true", help="skip idle minutes with the event scheduler"
+    )
+    parser.add_argument(
+        "--replicas", type=int, default=1, help="independent runs spread over processes"
+    )
+    parser.add_argument("--processes", type=int, help="worker processes for replicas")
+    parser.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="write counters and phase timings to FILE, csv if it ends with .csv else json",
+    )
+    parser.add_argument(
+        "--disease", action="store_true", help="run the SEIR disease layer on top of the mobility"
+    )
+    parser.add_argument("--infected", type=int, default=10, help="people infectious at the start")
+    parser.add_argument("--beta", type=float, default=0.05, help="hourly transmission rate per block")
+    parser.add_argument("--record", metavar="DIR", help="stream hourly metrics to DIR")
+    parser.add_argument(
+        "--positions", action="store_true", help="also record every position with --record"
+    )
+    parser.add_argument(
+        "--profiles", metavar="FILE", help="population profiles config, see profiles.json"
+    )
+    parser.add_argument("--checkpoint", metavar="DIR", help="save the final state to DIR")
+    parser.add_argument(
+        "--resume", metavar="DIR", help="continue from a checkpoint instead of a grid"
+    )
+    args = parser.parse_args()
+
+    grid = load_grid(args.grid) if args.resume is None else None
+    if args.replicas > 1:
+        run_replicas(grid, args)
+        return
+
+    profiler = Profiler() if args.profile else NULL_PROFILER
+    result = run_headless(
+        grid,
+        args.days,
+        seed=args.seed,
+        population=args.population[0] if args.population else None,
+        precompute_routes=args.routes,
+        events=args.events,
+        profiler=profiler,
+        disease=DiseaseParams(beta=args.beta, initial_infected=args.infected) if args.disease else None,
+        record=args.record,
+        record_positions=args.positions,
+        resume=args.resume,
+        checkpoint=args.checkpoint,
+        profiles=load_profiles(args.profiles) if args.profiles else None,
+    )
+    print(f"People: {result.population}")
+    print(f"Setup: {result.setup_time:.2f}s")
+    print(
+        f"Simulated {result.minutes} minutes in {result.elapsed:.2f}s "
+        f"({result.minutes_per_second:.0f} simulated minutes per second)"
+    )
+    disease = result.simulation.disease
+    if disease is not None:
+        print(", ".join(f"{state.name}: {count}" for state, count in disease.counts().items()))
+    if args.record:
+        print(f"Metrics written to {args.record}")
+    if args.checkpoint:
+        print(f"Checkpoint written to {args.checkpoint}")
+    if args.profile:
+        profiler.export(args.profile)
+        print(f"Profile written to {args.profile}")
+
+
+def run_replicas(grid, args: argparse.Namespace):
+    replicas = make_replicas(
+        args.replicas,
+        args.days,
+        base_seed=args.seed or 0,
+        populations=args.population,
+        precompute_routes=args.routes,
+        events=args.events,
+    )
+    summaries = []
+    for summary in run_ensemble(grid, replicas, args.processes):
+        summaries.append(summary)
+        print(
+            f"Replica {summary.index} (seed {summary.seed}): "
+            f"{summary.population} people, {summary.moving} moving, "
+            f"{summary.minutes_per_second:.0f} simulated minutes per second"
+        )
+
+    mean_speed = sum(s.minutes_per_second for s in summaries) / len(summaries)
+    print(f"Replicas: {len(summaries)}, mean {mean_speed:.0f} simulated minutes per second")
+
+
+if __name__ == "__main__":
+    main()
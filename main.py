@@ -1,10 +1,15 @@
 import pygame
 import sys
+import time
 
 from app import App, MouseState
 from colors import BLACK, GREEN, GREY, WHITE
+from components.autosave import AutoSaver
 from components.grid import GridState, save_grid_as_txt
-from components.timer import SECOND, Timer
+from components.profiling import NULL_PROFILER, Profiler
+from components.renderer import draw_profiler_overlay
+from components.sim_worker import SimulationWorker
+from components.timer import SECOND, SimulationClock, Timer
 from const import HEIGHT, WIDTH
 from widgets import Column, Button
 
@@ -61,13 +66,24 @@ def main():
         )
     )
 
-    simulation_timer = Timer(
-        SECOND / (120), lambda: app.simulation.update_min(), loop=True
-    )
+    # 120 simulated minutes per second at 1x, [ and ] change the speed
+    simulation_clock = SimulationClock(lambda: app.simulation.update_min(), rate=120)
+    # with --worker the simulation runs in its own process and the UI only
+    # draws the latest snapshot it publishes
+    simulation_worker = SimulationWorker(grid) if "--worker" in sys.argv else None
 
     def start_simulation():
+        if simulation_worker is not None:
+            if not simulation_worker.is_running:
+                simulation_worker.start()
+            return
         app.simulation.generate_population()
-        simulation_timer.start_timer()
+        simulation_clock.start_timer()
+
+    def change_speed(factor: float):
+        simulation_clock.set_speed(simulation_clock.speed * factor)
+        if simulation_worker is not None:
+            simulation_worker.set_speed(simulation_clock.speed)
 
     buttons_col.add_widget(
         Button(
@@ -77,17 +93,28 @@ def main():
         )
     )
 
-    # create a save timer
-    save_timer = Timer(SECOND * 30, lambda: save_grid_as_txt(grid), loop=True)
+    # create a save timer, the save itself runs on a background thread
+    autosaver = AutoSaver(grid)
+    save_timer = Timer(SECOND * 30, autosaver.request_save, loop=True)
     save_timer.start_timer()
 
+    # p toggles the profiler and its overlay on the hud
+    def toggle_profiler():
+        if app.simulation.profiler.enabled:
+            app.simulation.profiler = NULL_PROFILER
+        else:
+            app.simulation.profiler = Profiler()
+
     # Main loop
     while True:
+        frame_start = time.perf_counter()
+        profiler = app.simulation.profiler
         save_timer.update()
-        simulation_timer.update()
+        simulation_clock.update()
+        if simulation_worker is not None:
+            simulation_worker.apply(app.simulation)
 
         app.root_surface.fill(WHITE)
-        app.map_surface.fill(WHITE)
         app.button_surface.fill(GREY)
         app.hud_surface.fill(GREY)
 
@@ -97,12 +124,22 @@ def main():
         # Handle events
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
+                autosaver.request_save()
+                autosaver.close()
+                if simulation_worker is not None:
+                    simulation_worker.stop()
                 pygame.quit()
                 sys.exit()
 
             # handle key press events
             if event.type == pygame.KEYDOWN:
                 app.handle_key_click(event)
+                if event.key == pygame.K_RIGHTBRACKET:
+                    change_speed(10)
+                if event.key == pygame.K_LEFTBRACKET:
+                    change_speed(1 / 10)
+                if event.key == pygame.K_p:
+                    toggle_profiler()
 
             # scroll to zoom
             if event.type == pygame.MOUSEBUTTONDOWN:
@@ -170,15 +207,25 @@ def main():
             BLACK,
         )
         app.hud_surface.blit(text, (10, 10))
+        speed_label = f"Speed: {simulation_clock.speed:g}x"
+        if simulation_clock.is_running:
+            speed_label += f" (running at {simulation_clock.effective_speed:.0f}x)"
+        speed_text = font.render(speed_label, True, BLACK)
+        app.hud_surface.blit(speed_text, (10, 45))
+
+        if profiler.enabled:
+            draw_profiler_overlay(app.hud_surface, profiler, (440, 10))
 
         # Draw the app
-        app.draw()
+        with profiler.time("draw"):
+            app.draw()
 
         # blit the root surface
         screen.blit(app.root_surface, (0, 0))
 
         # Update display
         pygame.display.flip()
+        profiler.record("frame", time.perf_counter() - frame_start)
         clock.tick(60)
 
 